@@ -1,21 +1,274 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import datetime
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import bisect
+import collections
+import functools
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-class EcommercePlatform:
+from analytics import GROUPS, SalesAnalytics
+from events import INSERT, UPDATE, DELETE, ChangeBus
+from facets import SORTS, ProductFacets
+from instrumentation import Instrumentation
+from ratings import MIN_RATING, MAX_RATING, VendorRatings
+from recommendations import Recommendations
+from regions import ALL_REGIONS, RegionIndex, as_mask
+from records import (VendorRecord, ProductRecord, CustomerRecord, OrderRecord, OrderItemRecord, RatingRecord,
+                     format_timestamp)
+from storage import TABLES, MemoryStorage, SQLiteStorage
+
+# Length of the substrings (grams) indexed by the product search index. Fields
+# are padded with SEARCH_PAD so that every position starts a gram; a shorter
+# term is then a prefix of a gram wherever it occurs.
+SEARCH_GRAM_SIZE = 3
+SEARCH_PAD = '\0'
+
+# Number of recent search queries whose matching product ids are cached
+SEARCH_CACHE_SIZE = 256
+
+# Delay (ms) after the last keystroke before search-as-you-type runs
+SEARCH_DEBOUNCE_MS = 250
+
+# SQLite file used by the GUI to keep data between runs
+DATABASE_PATH = "ecommerce.db"
+
+# Rows fetched from the platform per page when filling a Treeview
+PAGE_SIZE = 200
+
+# Set to 1 to start the GUI with instrumentation on; Ctrl+Shift+D opens the
+# diagnostics window either way
+INSTRUMENT_ENV = "ECOMMERCE_INSTRUMENT"
+
+# Changes to the data are applied to open screens at most once per frame (ms)
+CHANGE_FRAME_MS = 16
+
+# Background threads running platform queries for the GUI, and how often (ms)
+# the Tk thread checks for their results
+QUERY_WORKERS = 2
+QUERY_POLL_MS = 20
+
+
+def _page_end(offset, limit):
+    return None if limit is None else offset + limit
+
+
+class ReadWriteLock:
+    # Many concurrent readers or one writer; the writer may re-enter and read.
+    # Waiting writers block new readers so a steady stream of queries cannot
+    # starve them, which means a reader must not take the read lock twice.
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = None
+        self.writer_depth = 0
+        self.writers_waiting = 0
+    
+    def acquire_read(self):
+        with self.condition:
+            if self.writer == threading.get_ident():
+                self.writer_depth += 1
+                return
+            while self.writer is not None or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+    
+    def release_read(self):
+        with self.condition:
+            if self.writer == threading.get_ident():
+                self.writer_depth -= 1
+                return
+            self.readers -= 1
+            if self.readers == 0:
+                self.condition.notify_all()
+    
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self.condition:
+            if self.writer == me:
+                self.writer_depth += 1
+                return
+            self.writers_waiting += 1
+            while self.writer is not None or self.readers:
+                self.condition.wait()
+            self.writers_waiting -= 1
+            self.writer = me
+            self.writer_depth = 1
+    
+    def release_write(self):
+        with self.condition:
+            self.writer_depth -= 1
+            if self.writer_depth == 0:
+                self.writer = None
+                self.condition.notify_all()
+
+
+class OrderError(Exception):
+    # Raised when a checkout, cancellation or rating is not allowed
+    pass
+
+
+class IdGenerator:
+    # Hands out increasing ids that are not reused after removals while the
+    # platform runs. It restarts from the highest stored id, so the id of a removed
+    # row that was the highest can be given out again after a restart.
+    # The lock only covers a counter update, so concurrent writers never wait long.
     def __init__(self):
+        self.lock = threading.Lock()
+        self.last = 0
+    
+    def next(self):
+        with self.lock:
+            self.last += 1
+            return self.last
+    
+    def advance(self, used_id):
+        # Called for rows that arrive with an id (storage load, bulk import)
+        with self.lock:
+            if used_id > self.last:
+                self.last = used_id
+
+
+def _reads(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_read()
+    return wrapper
+
+
+def _writes(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.lock.release_write()
+    return wrapper
+
+
+class EcommercePlatform:
+    def __init__(self, storage=None, sample_data=True):
+        # Durable backend; the in-memory lists below act as its working set
+        self.storage = storage if storage is not None else MemoryStorage()
+        
+        # Public methods are safe for concurrent readers and a single writer
+        self.lock = ReadWriteLock()
+        
         # In-memory data structures
         self.vendors = []
         self.products = []
         self.customers = []
         self.orders = []
         self.order_items = []
+        self.ratings = []
+        
+        # Primary key indexes (id -> record), kept in sync with the lists above
+        self.vendor_index = {}
+        self.product_index = {}
+        self.customer_index = {}
+        self.order_index = {}
+        self.order_item_index = {}
+        self.rating_index = {}
+        
+        # Rows and primary key index of each storage table
+        self.tables = {
+            'vendors': (self.vendors, self.vendor_index),
+            'products': (self.products, self.product_index),
+            'customers': (self.customers, self.customer_index),
+            'orders': (self.orders, self.order_index),
+            'order_items': (self.order_items, self.order_item_index),
+            'ratings': (self.ratings, self.rating_index),
+        }
+        
+        # Id generator of each table; ids stay unique after removals and
+        # bulk imports with explicit ids
+        self.ids = {table: IdGenerator() for table in TABLES}
+        
+        # Business name of each vendor, copied onto search results and order lines
+        self.vendor_names = {}
+        
+        # Products of each vendor (vendor_id -> list of products)
+        self.products_by_vendor = {}
+        
+        # Secondary index of order items (order_id -> {order_item_id: item}) and
+        # each item's position in self.order_items, so removal never copies the list
+        self.order_items_by_order = {}
+        self.order_item_positions = {}
+        
+        # The line of each product in each pending order ((order_id, product_id) ->
+        # item); the cart adds to this line instead of adding another
+        self.order_lines = {}
+        
+        # Orders of each customer, oldest first (customer_id -> list of orders), with
+        # the matching (order_date, order_id) sort keys for cursor pagination
+        self.orders_by_customer = {}
+        self.customer_order_keys = {}
+        
+        # (order_id, vendor_id) pairs already rated; a vendor is rated once per order
+        self.rated_order_vendors = set()
+        
+        # Search index over product name and tags (gram -> set of product ids),
+        # with its grams sorted for prefix lookups of short terms
+        self.search_index = {}
+        self.search_grams = []
+        
+        # Recent query terms -> matching product ids (LRU), with its own lock
+        # because concurrent readers update it
+        self.search_cache = collections.OrderedDict()
+        self.search_cache_lock = threading.Lock()
+        
+        # Row changes made by every mutating method, for views that keep up to date
+        self.changes = ChangeBus()
+        
+        # Instrumentation attached to this platform, if any (see instrumentation.py)
+        self.instruments = None
+        
+        # Running sales totals, updated on every cart and order status change
+        self.analytics = SalesAnalytics(self)
+        
+        # Co-purchase counts behind "customers also bought"
+        self.recommendations = Recommendations(self)
+        
+        # Price, tag and vendor indexes for filtered search
+        self.facets = ProductFacets(self)
+        
+        # Region masks of vendors and customers, and the vendors and products of each region
+        self.regions = RegionIndex(self)
+        
+        # Rating totals and vendor leaderboard
+        self.vendor_ratings = VendorRatings(self)
         
         self.current_user = None
         self.current_order = None
         
-        # Add sample data
-        self.add_sample_data()
+        # Load saved data, or add sample data on first start
+        if not self.storage.is_empty():
+            self.load_from_storage()
+        elif sample_data:
+            self.add_sample_data()
+        self.storage.attach(self)
+    
+    def load_from_storage(self):
+        for row in self.storage.load('vendors'):
+            self._insert_vendor(VendorRecord(**row))
+        self._insert_products([ProductRecord(**row) for row in self.storage.load('products')])
+        for row in self.storage.load('customers'):
+            self._insert_customer(CustomerRecord(**row))
+        for row in self.storage.load('orders'):
+            self._insert_order(OrderRecord(**row))
+        for row in self.storage.load('order_items'):
+            self._insert_order_item(OrderItemRecord(**row))
+        for row in self.storage.load('ratings'):
+            self._insert_rating(RatingRecord(**row))
     
     def add_sample_data(self):
         # Add sample vendors
@@ -34,127 +287,1016 @@ class EcommercePlatform:
         self.add_customer("John Doe", "555-123-4567", "123 Main St, Anytown, USA")
     
     # Vendor Administration Functions
-    def list_all_vendors(self):
-        return self.vendors
+    @_reads
+    def list_all_vendors(self, offset=0, limit=None):
+        if offset == 0 and limit is None:
+            return self.vendors
+        return self.vendors[offset:_page_end(offset, limit)]
     
+    def count_vendors(self):
+        return len(self.vendors)
+    
+    @_writes
     def add_vendor(self, business_name, geographical_presence):
-        vendor_id = len(self.vendors) + 1
-        self.vendors.append({
-            'vendor_id': vendor_id,
-            'business_name': business_name,
-            'feedback_score': 0.0,
-            'geographical_presence': geographical_presence
-        })
+        vendor_id = self.ids['vendors'].next()
+        vendor = VendorRecord(
+            vendor_id=vendor_id,
+            business_name=business_name,
+            feedback_score=0.0,
+            geographical_presence=geographical_presence
+        )
+        # Storage first, so a failed write leaves memory unchanged
+        self.storage.insert('vendors', vendor)
+        self._insert_vendor(vendor)
         return vendor_id
     
+    def _insert_vendor(self, vendor):
+        self.ids['vendors'].advance(vendor['vendor_id'])
+        self.vendors.append(vendor)
+        self.vendor_index[vendor['vendor_id']] = vendor
+        self.vendor_names[vendor['vendor_id']] = vendor['business_name']
+        self.regions.vendor_added(vendor)
+        self.vendor_ratings.vendor_added(vendor)
+        self.changes.emit('vendors', INSERT, (vendor,))
+    
+    def get_vendor(self, vendor_id):
+        return self.vendor_index.get(vendor_id)
+    
+    @_reads
+    def top_vendors(self, offset=0, limit=None):
+        # Vendors from best to worst rated
+        return [self.vendor_index[vendor_id] for vendor_id in self.vendor_ratings.top(offset, _page_end(offset, limit))]
+    
+    @_reads
+    def vendor_rating(self, vendor_id):
+        # {'ratings', 'feedback_score', 'score', 'rank'} of a vendor, or None
+        return self.vendor_ratings.summary(vendor_id)
+    
     # Product Catalog Management Functions
-    def list_vendor_products(self, vendor_id):
-        return [p for p in self.products if p['vendor_id'] == vendor_id]
+    @_reads
+    def list_vendor_products(self, vendor_id, offset=0, limit=None, region=None):
+        # region (names or a mask, e.g. a customer's region) hides vendors not present there
+        if not self._vendor_in_region(vendor_id, region):
+            return []
+        products = self.products_by_vendor.get(vendor_id, [])
+        return products[offset:_page_end(offset, limit)]
     
+    def count_vendor_products(self, vendor_id, region=None):
+        if not self._vendor_in_region(vendor_id, region):
+            return 0
+        return len(self.products_by_vendor.get(vendor_id, []))
+    
+    def _vendor_in_region(self, vendor_id, region):
+        mask = as_mask(region)
+        return mask is None or bool(self.regions.vendor_mask(vendor_id) & mask)
+    
+    @_writes
     def add_product(self, vendor_id, name, price, tag1=None, tag2=None, tag3=None):
-        product_id = len(self.products) + 1
-        self.products.append({
-            'product_id': product_id,
-            'vendor_id': vendor_id,
-            'name': name,
-            'price': price,
-            'tag1': tag1,
-            'tag2': tag2,
-            'tag3': tag3
-        })
+        if vendor_id not in self.vendor_index:
+            raise ValueError("Vendor {} not found".format(vendor_id))
+        product_id = self.ids['products'].next()
+        product = ProductRecord(
+            product_id=product_id,
+            vendor_id=vendor_id,
+            name=name,
+            price=price,
+            tag1=tag1,
+            tag2=tag2,
+            tag3=tag3
+        )
+        self.storage.insert('products', product)
+        self._insert_product(product)
         return product_id
     
+    def _insert_product(self, product):
+        self._insert_products([product])
+    
+    def _insert_products(self, products):
+        # Adds a batch of products, updating each index once for the whole batch
+        for product in products:
+            self.ids['products'].advance(product['product_id'])
+            self.product_index[product['product_id']] = product
+        self.products.extend(products)
+        self._index_products(products)
+        self._invalidate_search_cache(products)
+        self.changes.emit('products', INSERT, products)
+    
+    def _index_products(self, products):
+        # Per-vendor lists, filter indexes and text index of new products
+        for product in products:
+            self.products_by_vendor.setdefault(product['vendor_id'], []).append(product)
+        self.facets.products_added(products)
+        self.regions.products_added(products)
+        self._index_product_text(products)
+    
+    def get_product(self, product_id):
+        return self.product_index.get(product_id)
+    
     # Product Discovery Function
-    def search_products(self, search_term):
-        search_term = search_term.lower()
+    @_reads
+    def search_products(self, search_term, offset=0, limit=None, sort=None, region=None):
+        # Matches in product id order, or ranked by one of SORTS (e.g. 'vendor_score');
+        # region (names or a mask) keeps products of vendors present there
+        product_ids = self._match_product_ids(search_term)
+        mask = as_mask(region)
+        if mask is not None and mask != ALL_REGIONS:
+            vendor_masks = self.regions.vendor_masks
+            index = self.product_index
+            product_ids = [pid for pid in product_ids if vendor_masks.get(index[pid]['vendor_id'], 0) & mask]
+        if sort is not None:
+            end = _page_end(offset, limit)
+            terms = tuple(search_term.lower().split())
+            product_ids = self.facets.top(product_ids, len(product_ids) if end is None else end, terms, sort)
+        return self._product_results(product_ids[offset:_page_end(offset, limit)])
+    
+    @_reads
+    def search_product_ids(self, search_term):
+        return self._match_product_ids(search_term)
+    
+    @_reads
+    def query_products(self, search_term='', min_price=None, max_price=None, vendor_ids=None,
+                       tags=None, regions=None, sort='relevance', limit=20, facets=True):
+        # Filtered, ranked search. Filters left as None are not applied; within
+        # vendor_ids, tags and regions any value matches. Returns the number of
+        # matches, the ids of the best `limit` of them in order and, if asked,
+        # tag and vendor facet counts over all matches.
+        terms = tuple(search_term.lower().split())
+        text_matches = set(self._match_product_ids(search_term)) if terms else None
+        matches = self.facets.select(text_matches, min_price, max_price, vendor_ids, tags, regions)
+        return {
+            'total': len(matches),
+            'product_ids': self.facets.top(matches, limit, terms, sort),
+            'facets': self.facets.counts(matches) if facets else None
+        }
+    
+    @_reads
+    def product_results(self, product_ids):
+        return self._product_results(product_ids)
+    
+    def _product_results(self, product_ids):
+        # Builds search result rows (product fields plus vendor_name) for the given ids
         results = []
         
-        for product in self.products:
-            # Get vendor name
-            vendor_name = next((v['business_name'] for v in self.vendors if v['vendor_id'] == product['vendor_id']), "Unknown")
-            
-            # Check if search term matches name or tags
-            if (search_term in product['name'].lower() or
-                (product['tag1'] and search_term in product['tag1'].lower()) or
-                (product['tag2'] and search_term in product['tag2'].lower()) or
-                (product['tag3'] and search_term in product['tag3'].lower())):
-                
-                result = product.copy()
-                result['vendor_name'] = vendor_name
-                results.append(result)
+        vendor_names = self.vendor_names
+        for product_id in product_ids:
+            result = self.product_index[product_id].copy()
+            result['vendor_name'] = vendor_names.get(result['vendor_id'], "Unknown")
+            results.append(result)
                 
         return results
     
+    def _product_search_fields(self, product):
+        fields = [product['name'], product['tag1'], product['tag2'], product['tag3']]
+        return [field.lower() for field in fields if field]
+    
+    def _index_product_text(self, products):
+        # The SEARCH_GRAM_SIZE characters from every position of every field;
+        # shorter substrings are found through the grams they start
+        padding = SEARCH_PAD * (SEARCH_GRAM_SIZE - 1)
+        batch = {}
+        for product in products:
+            grams = set()
+            for field in self._product_search_fields(product):
+                padded = field + padding
+                for start in range(len(field)):
+                    grams.add(padded[start:start + SEARCH_GRAM_SIZE])
+            
+            for gram in grams:
+                batch.setdefault(gram, []).append(product['product_id'])
+        
+        for gram, product_ids in batch.items():
+            posting = self.search_index.get(gram)
+            if posting is None:
+                posting = self.search_index[gram] = set()
+                bisect.insort(self.search_grams, gram)
+            posting.update(product_ids)
+    
+    def _short_term_products(self, term):
+        # Products containing a term shorter than a gram: the union of the
+        # postings of the grams it starts
+        grams = self.search_grams
+        start = bisect.bisect_left(grams, term)
+        end = bisect.bisect_left(grams, term[:-1] + chr(ord(term[-1]) + 1), start)
+        return set().union(*(self.search_index[gram] for gram in grams[start:end]))
+    
+    def _product_matches(self, product, terms):
+        # Each term must be a substring of the name or a tag
+        fields = self._product_search_fields(product)
+        return all(any(term in field for field in fields) for term in terms)
+    
+    def _invalidate_search_cache(self, products):
+        # Only cached queries one of the new products matches are dropped
+        with self.search_cache_lock:
+            if not self.search_cache:
+                return
+            stale = [terms for terms in self.search_cache
+                     if any(self._product_matches(product, terms) for product in products)]
+            for terms in stale:
+                del self.search_cache[terms]
+    
+    def _match_product_ids(self, search_term):
+        terms = tuple(search_term.lower().split())
+        if not terms:
+            # An empty search matches every product, as a substring search would
+            return [product['product_id'] for product in self.products]
+        
+        with self.search_cache_lock:
+            cached = self.search_cache.get(terms)
+            if cached is not None:
+                self.search_cache.move_to_end(terms)
+                return list(cached)
+            
+            # A cached query whose every term is contained in one of the new terms
+            # (e.g. "pho" -> "phon") already holds a superset of the new matches
+            base = None
+            for cached_terms in reversed(self.search_cache):
+                if all(any(old in new for new in terms) for old in cached_terms):
+                    base = self.search_cache[cached_terms]
+                    break
+        
+        matches = self._lookup_product_ids(terms, base)
+        
+        with self.search_cache_lock:
+            self.search_cache[terms] = tuple(matches)
+            if len(self.search_cache) > SEARCH_CACHE_SIZE:
+                self.search_cache.popitem(last=False)
+        return matches
+    
+    def _lookup_product_ids(self, terms, base=None):
+        postings = []
+        long_terms = []
+        for term in terms:
+            if len(term) < SEARCH_GRAM_SIZE:
+                postings.append(self._short_term_products(term))
+            elif len(term) == SEARCH_GRAM_SIZE:
+                postings.append(self.search_index.get(term, set()))
+            else:
+                long_terms.append(term)
+                for start in range(len(term) - SEARCH_GRAM_SIZE + 1):
+                    postings.append(self.search_index.get(term[start:start + SEARCH_GRAM_SIZE], set()))
+        
+        # Filtering the earlier result is cheaper than any intersection only
+        # when it is smaller than the rarest gram's posting set
+        postings.sort(key=len)
+        if self.instruments:
+            self.instruments.scanned(min(len(postings[0]), len(base)) if base is not None else len(postings[0]))
+        if base is not None and len(base) <= len(postings[0]):
+            return [product_id for product_id in base if self._product_matches(self.product_index[product_id], terms)]
+        
+        # Intersect starting from the rarest gram
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            if not matches:
+                break
+            matches &= posting
+        
+        # Grams only narrow down candidates for longer terms, so confirm them
+        if long_terms:
+            matches = {product_id for product_id in matches
+                       if self._product_matches(self.product_index[product_id], long_terms)}
+        
+        return sorted(matches)
+    
     # Customer Management Functions
+    @_writes
     def add_customer(self, name, contact_number, shipping_address):
-        customer_id = len(self.customers) + 1
-        self.customers.append({
-            'customer_id': customer_id,
-            'name': name,
-            'contact_number': contact_number,
-            'shipping_address': shipping_address
-        })
+        customer_id = self.ids['customers'].next()
+        customer = CustomerRecord(
+            customer_id=customer_id,
+            name=name,
+            contact_number=contact_number,
+            shipping_address=shipping_address
+        )
+        self.storage.insert('customers', customer)
+        self._insert_customer(customer)
         return customer_id
     
+    def _insert_customer(self, customer):
+        self.ids['customers'].advance(customer['customer_id'])
+        self.customers.append(customer)
+        self.customer_index[customer['customer_id']] = customer
+        self.regions.customer_added(customer)
+        self.changes.emit('customers', INSERT, (customer,))
+    
     def get_customer(self, customer_id):
-        return next((c for c in self.customers if c['customer_id'] == customer_id), None)
+        return self.customer_index.get(customer_id)
+    
+    def customer_region(self, customer_id):
+        # Region mask of the customer's shipping address; every region if it names none
+        return self.regions.customer_region(customer_id)
     
     # Order Management Functions
+    @_writes
     def create_order(self, customer_id):
-        order_id = len(self.orders) + 1
-        current_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        self.orders.append({
-            'order_id': order_id,
-            'customer_id': customer_id,
-            'order_date': current_date,
-            'status': 'pending'
-        })
+        if customer_id not in self.customer_index:
+            raise OrderError("Customer {} not found".format(customer_id))
+        order_id = self.ids['orders'].next()
+        
+        order = OrderRecord(
+            order_id=order_id,
+            customer_id=customer_id,
+            order_date=time.time(),
+            status='pending'
+        )
+        self.storage.insert('orders', order)
+        self._insert_order(order)
         return order_id
     
+    def _insert_order(self, order):
+        self.ids['orders'].advance(order['order_id'])
+        self.orders.append(order)
+        self.order_index[order['order_id']] = order
+        
+        # New orders are the newest, so this is an append; only imported
+        # older orders need a binary search for their position
+        key = (order['order_date'], order['order_id'])
+        keys = self.customer_order_keys.setdefault(order['customer_id'], [])
+        orders = self.orders_by_customer.setdefault(order['customer_id'], [])
+        if not keys or keys[-1] < key:
+            keys.append(key)
+            orders.append(order)
+        else:
+            position = bisect.bisect(keys, key)
+            keys.insert(position, key)
+            orders.insert(position, order)
+        self.analytics.order_added(order)
+        self.changes.emit('orders', INSERT, (order,))
+    
+    def get_order(self, order_id):
+        return self.order_index.get(order_id)
+    
+    @_writes
     def add_to_order(self, order_id, product_id, vendor_id, quantity=1):
-        order_item_id = len(self.order_items) + 1
-        
-        self.order_items.append({
-            'order_item_id': order_item_id,
-            'order_id': order_id,
-            'product_id': product_id,
-            'vendor_id': vendor_id,
-            'quantity': quantity
+        # The line keeps the product's name and price and the vendor's name as they
+        # are now, so carts and past orders read without joining the catalog. A
+        # product already in the order gets its quantity raised instead of a new
+        # line. The line's vendor is the product's; vendor_id is kept for callers.
+        return self._add_items_to_order(order_id, ((product_id, quantity),))[product_id]
+    
+    @_writes
+    def add_items_to_order(self, order_id, items):
+        # Adds many (product_id, quantity) pairs at once; quantities of the same
+        # product, in the batch or already in the order, add up on one line.
+        # Nothing is added unless every pair is valid. Returns {product_id: order_item_id}.
+        return self._add_items_to_order(order_id, items)
+    
+    def _add_items_to_order(self, order_id, items):
+        self._pending_order(order_id)
+        self._check_cart_items(items, 1)
+        quantities = {}
+        for product_id, quantity in items:
+            if product_id not in quantities:
+                line = self.order_lines.get((order_id, product_id))
+                quantities[product_id] = line['quantity'] if line else 0
+            quantities[product_id] += quantity
+        return self._set_order_lines(order_id, {
+            product_id: (self.product_index[product_id]['vendor_id'], quantity)
+            for product_id, quantity in quantities.items()
+        })
+    
+    @_writes
+    def set_order_quantities(self, order_id, items):
+        # Sets the quantity of many (product_id, quantity) pairs at once; 0 removes
+        # the product's line. Nothing changes unless every pair is valid. Returns
+        # {product_id: order_item_id} of the lines left for those products.
+        self._pending_order(order_id)
+        self._check_cart_items(items, 0)
+        return self._set_order_lines(order_id, {
+            product_id: (self.product_index[product_id]['vendor_id'], quantity) for product_id, quantity in items
         })
-        return order_item_id
     
+    def _check_cart_items(self, items, minimum):
+        # Every problem in the batch is reported at once
+        errors = []
+        for product_id, quantity in items:
+            product = self.product_index.get(product_id)
+            if not product:
+                errors.append("Product {} not found".format(product_id))
+            elif product['vendor_id'] not in self.vendor_index:
+                errors.append("Vendor {} not found".format(product['vendor_id']))
+            elif not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < minimum:
+                errors.append("Quantity of product {} must be at least {}".format(product_id, minimum))
+        if errors:
+            raise OrderError("; ".join(errors))
+    
+    def _set_order_lines(self, order_id, quantities):
+        # quantities: {product_id: (vendor_id, quantity)}, already validated. Lines
+        # are added, updated or removed (quantity 0); storage is written once per
+        # kind, before memory changes.
+        lines = {}
+        added = []
+        updated = []
+        removed = []
+        for product_id, (vendor_id, quantity) in quantities.items():
+            item = self.order_lines.get((order_id, product_id))
+            if item is None and quantity > 0:
+                product = self.product_index[product_id]
+                item = OrderItemRecord(
+                    order_item_id=self.ids['order_items'].next(),
+                    order_id=order_id,
+                    product_id=product_id,
+                    vendor_id=vendor_id,
+                    quantity=quantity,
+                    unit_price=product['price'],
+                    product_name=product['name'],
+                    vendor_name=self.vendor_names.get(vendor_id)
+                )
+                added.append(item)
+            elif item is not None and quantity == 0:
+                removed.append(item)
+                continue
+            elif item is not None and quantity != item['quantity']:
+                updated.append((item, quantity))
+            if item is not None:
+                lines[product_id] = item['order_item_id']
+        
+        self.storage.insert_many('order_items', added)
+        if updated:
+            self.storage.update_item_quantities([(quantity, item['order_item_id']) for item, quantity in updated])
+        for item in added:
+            self._insert_order_item(item)
+        for item, quantity in updated:
+            self.analytics.item_removed(item)
+            item['quantity'] = quantity
+            self.analytics.item_added(item)
+        self.changes.emit('order_items', UPDATE, [item for item, quantity in updated])
+        for item in removed:
+            self._remove_order_item(item)
+        return lines
+    
+    def _fill_order_item(self, item):
+        if item['product_name'] is None or item['unit_price'] is None:
+            # Saved before order lines kept their names and price, or imported
+            # without them; a product's price never changes, so it is the line's
+            product = self.product_index.get(item['product_id'])
+            if item['product_name'] is None:
+                item['product_name'] = product['name'] if product else None
+                item['vendor_name'] = self.vendor_names.get(item['vendor_id'])
+            if item['unit_price'] is None and product:
+                item['unit_price'] = product['price']
+    
+    def _insert_order_item(self, item):
+        self._fill_order_item(item)
+        self.ids['order_items'].advance(item['order_item_id'])
+        self.order_item_positions[item['order_item_id']] = len(self.order_items)
+        self.order_items.append(item)
+        self.order_item_index[item['order_item_id']] = item
+        self.order_items_by_order.setdefault(item['order_id'], {})[item['order_item_id']] = item
+        order = self.order_index.get(item['order_id'])
+        if order and order['status'] == 'pending':
+            self.order_lines[(item['order_id'], item['product_id'])] = item
+        self.analytics.item_added(item)
+        self.recommendations.item_added(item)
+        self.changes.emit('order_items', INSERT, (item,))
+    
+    @_reads
     def get_order_items(self, order_id):
-        items = []
-        for item in self.order_items:
-            if item['order_id'] == order_id:
-                # Get product and vendor details
-                product = next((p for p in self.products if p['product_id'] == item['product_id']), None)
-                vendor = next((v for v in self.vendors if v['vendor_id'] == item['vendor_id']), None)
-                
-                if product and vendor:
-                    item_details = item.copy()
-                    item_details['product_name'] = product['name']
-                    item_details['price'] = product['price']
-                    item_details['vendor_name'] = vendor['business_name']
-                    items.append(item_details)
-        
-        return items
+        # The order's lines themselves; they carry product_name, unit_price and
+        # vendor_name, and callers must not modify them
+        order_items = self.order_items_by_order.get(order_id, {})
+        if self.instruments:
+            self.instruments.scanned(len(order_items))
+        return list(order_items.values())
     
+    @_writes
     def remove_from_order(self, order_item_id):
-        self.order_items = [item for item in self.order_items if item['order_item_id'] != order_item_id]
+        # Only lines of pending orders can be removed
+        item = self.order_item_index.get(order_item_id)
+        if item:
+            self._pending_order(item['order_id'])
+            self._remove_order_item(item)
     
+    def _remove_order_item(self, item):
+        order_item_id = item['order_item_id']
+        self.storage.delete_order_item(order_item_id)
+        del self.order_item_index[order_item_id]
+        self.analytics.item_removed(item)
+        
+        # Move the last item into the freed slot instead of rebuilding the list
+        position = self.order_item_positions.pop(order_item_id)
+        last_item = self.order_items.pop()
+        if last_item is not item:
+            self.order_items[position] = last_item
+            self.order_item_positions[last_item['order_item_id']] = position
+        
+        order_items = self.order_items_by_order.get(item['order_id'])
+        if order_items:
+            order_items.pop(order_item_id, None)
+            if not order_items:
+                del self.order_items_by_order[item['order_id']]
+        line_key = (item['order_id'], item['product_id'])
+        if self.order_lines.get(line_key) is item:
+            # Orders saved before lines were merged may hold another line of the product
+            del self.order_lines[line_key]
+            for other in (order_items or {}).values():
+                if other['product_id'] == item['product_id']:
+                    self.order_lines[line_key] = other
+        self.recommendations.item_removed(item)
+        self.changes.emit('order_items', DELETE, (item,))
+    
+    @_writes
+    def checkout_order(self, order_id):
+        # Validates every item, keeps the unit price it was added at (or freezes the
+        # current price for lines saved without one), then completes the order;
+        # storage applies the prices and status in one transaction
+        order = self._pending_order(order_id)
+        items = list(self.order_items_by_order.get(order_id, {}).values())
+        if not items:
+            raise OrderError("Order {} has no items".format(order_id))
+        
+        prices = []
+        for item in items:
+            product = self.product_index.get(item['product_id'])
+            if not product:
+                raise OrderError("Product {} is no longer available".format(item['product_id']))
+            if item['vendor_id'] not in self.vendor_index or product['vendor_id'] != item['vendor_id']:
+                raise OrderError("Vendor {} does not sell product {}".format(item['vendor_id'], item['product_id']))
+            prices.append((item, item['unit_price'] if item['unit_price'] is not None else product['price']))
+        
+        repriced = [item for item, price in prices if item['unit_price'] != price]
+        self._set_order_status(order, 'completed', [(price, item['order_item_id']) for item, price in prices])
+        self.changes.emit('order_items', UPDATE, repriced)
+    
+    @_writes
     def cancel_order(self, order_id):
-        for order in self.orders:
-            if order['order_id'] == order_id:
-                order['status'] = 'cancelled'
-                break
+        self._set_order_status(self._pending_order(order_id), 'cancelled')
+    
+    def _pending_order(self, order_id):
+        order = self.order_index.get(order_id)
+        if not order:
+            raise OrderError("Order {} not found".format(order_id))
+        if order['status'] != 'pending':
+            raise OrderError("Order {} is already {}".format(order_id, order['status']))
+        return order
+    
+    def _set_order_status(self, order, status, item_prices=()):
+        # Storage first, so a failed write leaves the order and its prices unchanged
+        self.storage.update_order_status(order['order_id'], status, item_prices)
+        for price, order_item_id in item_prices:
+            self.order_item_index[order_item_id]['unit_price'] = price
+        old_status = order['status']
+        order['status'] = status
+        if old_status == 'pending':
+            for item in self.order_items_by_order.get(order['order_id'], {}).values():
+                self.order_lines.pop((order['order_id'], item['product_id']), None)
+        self.analytics.status_changed(order, old_status)
+        self.recommendations.status_changed(order, old_status)
+        self.changes.emit('orders', UPDATE, (order,))
+    
+    @_reads
+    def get_customer_orders(self, customer_id, offset=0, limit=None, before=None):
+        # Newest first. `before` is an order_id cursor: only orders older than it
+        # are returned, so the last order of one page fetches the next.
+        keys = self.customer_order_keys.get(customer_id, [])
+        end = len(keys)
+        if before is not None:
+            cursor = self.order_index.get(before)
+            if not cursor or cursor['customer_id'] != customer_id:
+                return []
+            end = bisect.bisect_left(keys, (cursor['order_date'], cursor['order_id']))
+        end = max(0, end - offset)
+        start = 0 if limit is None else max(0, end - limit)
+        if self.instruments:
+            self.instruments.scanned(end - start)
+        return self.orders_by_customer.get(customer_id, [])[start:end][::-1]
+    
+    def count_customer_orders(self, customer_id):
+        return len(self.customer_order_keys.get(customer_id, ()))
+    
+    # Vendor Rating Functions
+    @_writes
+    def rate_vendor(self, order_id, vendor_id, rating):
+        # Rates a vendor that sold items in a completed order; once per order and vendor
+        fields = {'order_id': order_id, 'vendor_id': vendor_id, 'rating': rating, 'rated_at': time.time()}
+        error = self._check_rating_row(fields)
+        if error:
+            raise OrderError(error)
+        rating = RatingRecord(rating_id=self.ids['ratings'].next(), **fields)
+        self.storage.insert('ratings', rating)
+        self._insert_rating(rating)
+        self.storage.update_vendor_scores([(self.vendor_index[vendor_id]['feedback_score'], vendor_id)])
+        return rating['rating_id']
+    
+    def _insert_rating(self, rating):
+        self.ids['ratings'].advance(rating['rating_id'])
+        self.ratings.append(rating)
+        self.rating_index[rating['rating_id']] = rating
+        self.rated_order_vendors.add((rating['order_id'], rating['vendor_id']))
+        self.vendor_ratings.rating_added(rating)
+        self.changes.emit('ratings', INSERT, (rating,))
+        vendor = self.vendor_index.get(rating['vendor_id'])
+        if vendor:
+            self.changes.emit('vendors', UPDATE, (vendor,))
+    
+    def _insert_ratings(self, ratings):
+        # Bulk imported ratings; the vendors' new scores are saved once per batch
+        for rating in ratings:
+            self._insert_rating(rating)
+        vendor_ids = {rating['vendor_id'] for rating in ratings}
+        self.storage.update_vendor_scores([(self.vendor_index[v]['feedback_score'], v) for v in vendor_ids])
+    
+    @_reads
+    def rateable_vendors(self, order_id):
+        # Vendors of a completed order that have not been rated for it yet
+        order = self.order_index.get(order_id)
+        if not order or order['status'] != 'completed':
+            return []
+        vendor_ids = {item['vendor_id'] for item in self.order_items_by_order.get(order_id, {}).values()}
+        return sorted(v for v in vendor_ids if (order_id, v) not in self.rated_order_vendors)
     
-    def get_customer_orders(self, customer_id):
-        customer_orders = [order for order in self.orders if order['customer_id'] == customer_id]
-        # Sort by date (newest first)
-        customer_orders.sort(key=lambda x: x['order_date'], reverse=True)
-        return customer_orders
+    @_reads
+    def also_bought(self, product_id, k=10):
+        # Products most often in the same completed order: [(product_id, orders)]
+        return self.recommendations.also_bought(product_id, k)
+    
+    # Bulk Import and Export Functions
+    @_writes
+    def bulk_add(self, table, rows):
+        # Adds already type-converted rows to a table in one batch. Rows without an
+        # id get a new one. Returns (ids of added rows, [(row index, error message)]).
+        record_class, insert, check = self._bulk_handlers()[table]
+        id_column = TABLES[table][0]
+        
+        index_of_table = self.tables[table][1]
+        records = []
+        errors = []
+        batch_ids = set()
+        for index, row in enumerate(rows):
+            record_id = row.get(id_column)
+            error = check(row)
+            if error is None and record_id is not None and (record_id in batch_ids or record_id in index_of_table):
+                error = "Duplicate {} {}".format(id_column, record_id)
+            if error is not None:
+                errors.append((index, error))
+                continue
+            
+            if record_id is None:
+                record_id = self.ids[table].next()
+            else:
+                self.ids[table].advance(record_id)
+            fields = dict(row)
+            fields[id_column] = record_id
+            batch_ids.add(record_id)
+            records.append(record_class(**fields))
+        
+        if table == 'order_items':
+            # Filled in before saving, so the saved lines carry them too
+            for record in records:
+                self._fill_order_item(record)
+        # Storage first, so a failed write leaves memory unchanged
+        self.storage.insert_many(table, records)
+        insert(records)
+        return [record[id_column] for record in records], errors
+    
+    def _bulk_handlers(self):
+        return {
+            'vendors': (VendorRecord, functools.partial(self._insert_each, self._insert_vendor), self._check_vendor_row),
+            'products': (ProductRecord, self._insert_products, self._check_product_row),
+            'customers': (CustomerRecord, functools.partial(self._insert_each, self._insert_customer), self._check_customer_row),
+            'orders': (OrderRecord, functools.partial(self._insert_each, self._insert_order), self._check_order_row),
+            'order_items': (OrderItemRecord, functools.partial(self._insert_each, self._insert_order_item), self._check_order_item_row),
+            'ratings': (RatingRecord, self._insert_ratings, self._check_rating_row),
+        }
+    
+    def _insert_each(self, insert, records):
+        for record in records:
+            insert(record)
+    
+    def _check_vendor_row(self, row):
+        if not row.get('business_name'):
+            return "business_name is required"
+        return None
+    
+    def _check_product_row(self, row):
+        if not row.get('name'):
+            return "name is required"
+        if row.get('price') is None or not math.isfinite(row['price']) or row['price'] < 0:
+            return "price must be a non-negative number"
+        if row.get('vendor_id') not in self.vendor_index:
+            return "Unknown vendor_id {}".format(row.get('vendor_id'))
+        return None
+    
+    def _check_customer_row(self, row):
+        if not row.get('name'):
+            return "name is required"
+        return None
+    
+    def _check_order_row(self, row):
+        if row.get('customer_id') not in self.customer_index:
+            return "Unknown customer_id {}".format(row.get('customer_id'))
+        if not row.get('order_date') or not row.get('status'):
+            return "order_date and status are required"
+        return None
+    
+    def _check_order_item_row(self, row):
+        if row.get('order_id') not in self.order_index:
+            return "Unknown order_id {}".format(row.get('order_id'))
+        product = self.product_index.get(row.get('product_id'))
+        if not product:
+            return "Unknown product_id {}".format(row.get('product_id'))
+        if row.get('vendor_id') != product['vendor_id']:
+            return "vendor_id {} does not sell product {}".format(row.get('vendor_id'), product['product_id'])
+        if not row.get('quantity') or row['quantity'] < 1:
+            return "quantity must be at least 1"
+        return None
+    
+    def _check_rating_row(self, row):
+        order = self.order_index.get(row.get('order_id'))
+        if not order:
+            return "Unknown order_id {}".format(row.get('order_id'))
+        if order['status'] != 'completed':
+            return "Order {} is not completed".format(order['order_id'])
+        vendor_id = row.get('vendor_id')
+        items = self.order_items_by_order.get(order['order_id'], {}).values()
+        if not any(item['vendor_id'] == vendor_id for item in items):
+            return "Vendor {} sold nothing in order {}".format(vendor_id, order['order_id'])
+        if (order['order_id'], vendor_id) in self.rated_order_vendors:
+            return "Vendor {} is already rated for order {}".format(vendor_id, order['order_id'])
+        if not isinstance(row.get('rating'), int) or not MIN_RATING <= row['rating'] <= MAX_RATING:
+            return "rating must be a whole number from {} to {}".format(MIN_RATING, MAX_RATING)
+        if not row.get('rated_at'):
+            return "rated_at is required"
+        return None
+    
+    @_reads
+    def get_rows(self, table, offset=0, limit=None):
+        # Plain dict copies of a table's rows, for export
+        rows = self.tables[table][0]
+        return [row.copy() for row in rows[offset:_page_end(offset, limit)]]
+    
+    # Sales Analytics Functions
+    @_reads
+    def get_order_total(self, order_id):
+        return self.analytics.order_totals.get(order_id, 0.0)
+    
+    @_reads
+    def get_sales_summary(self):
+        analytics = self.analytics
+        return {
+            'status_totals': dict(analytics.status_totals),
+            'status_counts': dict(analytics.status_counts),
+            'top_vendors': analytics.top_vendors(),
+            'top_products': analytics.top_products()
+        }
+    
+    @_reads
+    def get_revenue_by(self, group, statuses=('completed',)):
+        return self.analytics.revenue_by(group, statuses)
+
+
+class PagedTreeview:
+    # Fills a Treeview one page at a time and fetches the next page as the user scrolls near the end
+    
+    # Instrumentation recording each page insert as "ui.<name>", when enabled
+    instruments = None
+    
+    def __init__(self, tree, name="tree", page_size=PAGE_SIZE):
+        self.tree = tree
+        self.name = name
+        self.page_size = page_size
+        self.total = 0
+        self.loaded = 0
+        self.fetch_page = None
+        self.row_values = None
+        self.row_key = None
+        self.pending = False
+        
+        self.scrollbar = ttk.Scrollbar(tree.master, orient='vertical', command=tree.yview)
+        self.scrollbar.pack(side='right', fill='y', before=tree)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        
+        self.count_label = ttk.Label(tree.master, text="")
+        self.count_label.pack(anchor='w', after=tree)
+    
+    def load(self, total, fetch_page, row_values, row_key=None):
+        # fetch_page(offset, limit) returns records; row_values(record) returns the row's
+        # values; row_key(record), if given, names the row so it can be updated in place
+        self.tree.delete(*self.tree.get_children())
+        self.total = total
+        self.loaded = 0
+        self.fetch_page = fetch_page
+        self.row_values = row_values
+        self.row_key = row_key
+        self.load_next_page()
+    
+    def clear(self):
+        self.load(0, lambda offset, limit: [], None)
+    
+    # Row level changes, for rows loaded with a row_key
+    def insert_row(self, record, at_top=False):
+        if self.row_key is None:
+            return
+        iid = str(self.row_key(record))
+        if self.tree.exists(iid):
+            self.tree.item(iid, values=self.row_values(record))
+            return
+        self.total += 1
+        # A row belonging after the loaded pages arrives with them
+        if at_top or self.loaded == self.total - 1:
+            self.tree.insert('', 0 if at_top else 'end', iid=iid, values=self.row_values(record))
+            self.loaded += 1
+    
+    def update_row(self, record):
+        if self.row_key is not None and self.tree.exists(str(self.row_key(record))):
+            self.tree.item(str(self.row_key(record)), values=self.row_values(record))
+    
+    def delete_row(self, record):
+        if self.row_key is not None and self.tree.exists(str(self.row_key(record))):
+            self.tree.delete(str(self.row_key(record)))
+            self.loaded -= 1
+            self.total -= 1
+    
+    def update_count(self):
+        self.count_label.config(text="Showing {} of {}".format(self.loaded, self.total))
+    
+    def load_next_page(self):
+        self.pending = False
+        if self.loaded < self.total:
+            start = time.perf_counter()
+            records = self.fetch_page(self.loaded, self.page_size)
+            for record in records:
+                iid = str(self.row_key(record)) if self.row_key else ''
+                self.tree.insert('', 'end', iid=iid or None, values=self.row_values(record))
+            self.loaded += len(records)
+            if PagedTreeview.instruments:
+                PagedTreeview.instruments.record("ui." + self.name, time.perf_counter() - start, len(records), len(records))
+            if not records:
+                self.total = self.loaded
+        self.update_count()
+    
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Fetch more once the bottom of the loaded rows comes into view
+        if not self.pending and self.loaded < self.total and float(last) >= 0.9:
+            self.pending = True
+            self.tree.after_idle(self.load_next_page)
+
+
+def paged_list(records):
+    # Adapts an already built list to the fetch_page(offset, limit) interface
+    return lambda offset, limit: records[offset:offset + limit]
+
+
+class ChangeFeed:
+    # Passes the platform's row changes to the GUI's views on the Tk thread. Changes
+    # are collected from any thread and handed out once per frame, with repeated
+    # changes to one row reduced to the last, so a burst of changes costs one redraw.
+    def __init__(self, root, bus):
+        self.root = root
+        self.incoming = collections.deque()
+        self.listeners = []
+        bus.subscribe(self.incoming.extend)
+        self.root.after(CHANGE_FRAME_MS, self.flush)
+    
+    def listen(self, tables, handler, widget=None):
+        # handler(changes) gets the changes of the given tables; it is dropped
+        # once `widget` is destroyed
+        listener = (frozenset(tables), handler)
+        self.listeners.append(listener)
+        if widget is not None:
+            widget.bind('<Destroy>', lambda event: self.unlisten(listener), add='+')
+        return listener
+    
+    def unlisten(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+    
+    def flush(self):
+        try:
+            self.hand_out()
+        finally:
+            # Always scheduled again, or the views would silently stop updating
+            self.root.after(CHANGE_FRAME_MS, self.flush)
+    
+    def hand_out(self):
+        latest = {}
+        while self.incoming:
+            change = self.incoming.popleft()
+            key = (change.table, change.key)
+            # An insert followed by updates is still an insert for the views
+            if change.kind == UPDATE and key in latest and latest[key].kind == INSERT:
+                change = change._replace(kind=INSERT)
+            latest.pop(key, None)
+            latest[key] = change
+        
+        if latest:
+            changes = list(latest.values())
+            for listener in list(self.listeners):
+                tables, handler = listener
+                relevant = [change for change in changes if change.table in tables]
+                if relevant:
+                    try:
+                        handler(relevant)
+                    except tk.TclError:
+                        # The view's widgets are gone
+                        self.unlisten(listener)
+                    except Exception:
+                        # Reported like any Tk callback error; the other views still get the changes
+                        self.root.report_callback_exception(*sys.exc_info())
+
+
+def apply_changes(pager, changes, belongs, at_top=False):
+    # Applies row changes to a PagedTreeview; belongs(record) says whether a row is part of the view
+    for change in changes:
+        if not belongs(change.record):
+            continue
+        if change.kind == INSERT:
+            pager.insert_row(change.record, at_top)
+        elif change.kind == UPDATE:
+            pager.update_row(change.record)
+        else:
+            pager.delete_row(change.record)
+    pager.update_count()
+
+
+class LazyNotebook(ttk.Notebook):
+    # Notebook whose tabs are filled in by their build function when first selected
+    def __init__(self, master):
+        ttk.Notebook.__init__(self, master)
+        self.builders = {}
+        self.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+    
+    def add_lazy(self, build, text):
+        tab = ttk.Frame(self, padding=10)
+        self.add(tab, text=text)
+        self.builders[str(tab)] = (build, tab)
+        if len(self.tabs()) == 1:
+            self.build_tab(str(tab))
+    
+    def build_tab(self, tab_name):
+        entry = self.builders.pop(tab_name, None)
+        if entry:
+            build, tab = entry
+            build(tab)
+    
+    def on_tab_changed(self, event):
+        self.build_tab(self.select())
+
+
+class QueryExecutor:
+    # Runs platform queries on worker threads and hands results back to the Tk thread.
+    # Submitting a query under a key makes any older query with that key stale: it is
+    # skipped if it has not started yet, and its result is dropped otherwise.
+    def __init__(self, root, max_workers=QUERY_WORKERS):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self.results = queue.Queue()
+        self.generations = {}
+        self.pending = 0
+    
+    def submit(self, key, query, on_result, on_error=None):
+        generation = self.generations.get(key, 0) + 1
+        self.generations[key] = generation
+        
+        def run():
+            if self.generations.get(key) != generation:
+                self.results.put((key, generation, None, None, None, None))
+                return
+            try:
+                self.results.put((key, generation, on_result, query(), on_error, None))
+            except Exception as error:
+                self.results.put((key, generation, on_result, None, on_error, error))
+        
+        self.pending += 1
+        if self.pending == 1:
+            self.root.config(cursor='watch')
+            self.root.after(QUERY_POLL_MS, self.poll)
+        self.pool.submit(run)
+    
+    def poll(self):
+        try:
+            while True:
+                try:
+                    key, generation, on_result, result, on_error, error = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                
+                self.pending -= 1
+                if self.generations.get(key) != generation:
+                    continue
+                try:
+                    if error is None:
+                        on_result(result)
+                    elif on_error:
+                        on_error(error)
+                    else:
+                        messagebox.showerror("Error", str(error))
+                except tk.TclError:
+                    # The screen that asked for the result has been closed
+                    pass
+                except Exception:
+                    # A failing handler is reported like any Tk callback error; the
+                    # other results are still handed out
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            # Always polled again while queries are out, whatever a handler did
+            if self.pending:
+                self.root.after(QUERY_POLL_MS, self.poll)
+            else:
+                self.root.config(cursor='')
+    
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
 
 
 class EcommerceGUI:
@@ -163,25 +1305,146 @@ class EcommerceGUI:
         self.root.title("Multi-Vendor Ecommerce Platform")
         self.root.geometry("800x600")
         
-        self.platform = EcommercePlatform()
+        self.queries = QueryExecutor(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+        
+        # Screens are built the first time they are shown and then kept; only the
+        # logged in customer's dashboard is replaced when another customer logs in
+        self.screens = {}
+        self.current_screen = None
+        self.dashboard_customer_id = None
         
-        # Set up the initial login/register screen
+        # Hidden diagnostics window; instrumentation stays off until enabled there
+        self.instruments = Instrumentation()
+        self.root.bind('<Control-Shift-D>', lambda event: self.show_diagnostics())
+        
+        # The window comes up at once; saved data loads in the background and the
+        # screens that need it stay disabled until then
+        self.platform = None
+        self.login_buttons = []
         self.setup_login_screen()
+        self.queries.submit('startup', lambda: EcommercePlatform(SQLiteStorage(DATABASE_PATH)),
+                            self.platform_loaded, self.platform_failed)
+    
+    def platform_loaded(self, platform):
+        self.platform = platform
+        self.feed = ChangeFeed(self.root, platform.changes)
+        if os.environ.get(INSTRUMENT_ENV) == "1":
+            self.set_instrumented(True)
+        for button in self.login_buttons:
+            button.config(state='normal')
+        self.status_label.config(text="")
+    
+    def platform_failed(self, error):
+        self.status_label.config(text="Could not load data: {}".format(error))
+    
+    def show_screen(self, name, build):
+        if self.current_screen is not None:
+            self.current_screen.pack_forget()
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = self.screens[name] = ttk.Frame(self.root)
+            build(screen)
+        screen.pack(fill='both', expand=True)
+        self.current_screen = screen
     
     def setup_login_screen(self):
-        # Clear any existing widgets
-        for widget in self.root.winfo_children():
-            widget.destroy()
-            
-        frame = ttk.Frame(self.root, padding=20)
+        self.show_screen('login', self.build_login_screen)
+    
+    def build_login_screen(self, screen):
+        frame = ttk.Frame(screen, padding=20)
         frame.pack(expand=True)
         
         ttk.Label(frame, text="Multi-Vendor Ecommerce Platform", font=("Arial", 16)).pack(pady=10)
         
-        ttk.Button(frame, text="Login as Customer", command=self.login_as_customer).pack(pady=5, fill='x')
-        ttk.Button(frame, text="Register as Customer", command=self.register_customer).pack(pady=5, fill='x')
-        ttk.Button(frame, text="Vendor Management", command=self.vendor_management).pack(pady=5, fill='x')
-        ttk.Button(frame, text="Exit", command=self.root.destroy).pack(pady=5, fill='x')
+        for text, command in (("Login as Customer", self.login_as_customer),
+                              ("Register as Customer", self.register_customer),
+                              ("Vendor Management", self.vendor_management)):
+            button = ttk.Button(frame, text=text, command=command, state='disabled')
+            button.pack(pady=5, fill='x')
+            self.login_buttons.append(button)
+        ttk.Button(frame, text="Exit", command=self.quit).pack(pady=5, fill='x')
+        
+        self.status_label = ttk.Label(frame, text="Loading data...")
+        self.status_label.pack(pady=5)
+    
+    def quit(self):
+        self.queries.shutdown()
+        if self.platform:
+            self.platform.storage.close()
+        self.root.destroy()
+    
+    def set_instrumented(self, enabled):
+        if enabled:
+            self.instruments.attach(self.platform)
+            PagedTreeview.instruments = self.instruments
+        else:
+            self.instruments.detach()
+            PagedTreeview.instruments = None
+    
+    def show_diagnostics(self):
+        if not self.platform:
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("760x420")
+        
+        enabled_var = tk.BooleanVar(value=self.instruments.enabled)
+        top_frame = ttk.Frame(window, padding=10)
+        top_frame.pack(fill='x')
+        ttk.Checkbutton(top_frame, text="Instrumentation enabled", variable=enabled_var,
+                        command=lambda: self.set_instrumented(enabled_var.get())).pack(side='left')
+        
+        columns = ('Name', 'Calls', 'p50 ms', 'p95 ms', 'p99 ms', 'Scanned', 'Returned')
+        stats_tree = ttk.Treeview(window, columns=columns, show='headings')
+        for col in columns:
+            stats_tree.heading(col, text=col)
+            stats_tree.column(col, width=90 if col != 'Name' else 180)
+        stats_tree.pack(fill='both', expand=True, padx=10)
+        
+        def refresh():
+            stats_tree.delete(*stats_tree.get_children())
+            for name, stats in self.instruments.report().items():
+                stats_tree.insert('', 'end', values=(
+                    name,
+                    stats['calls'],
+                    "{:.3f}".format(stats['p50_ms']),
+                    "{:.3f}".format(stats['p95_ms']),
+                    "{:.3f}".format(stats['p99_ms']),
+                    stats['rows_scanned'],
+                    stats['rows_returned']
+                ))
+        
+        def dump_json():
+            path = filedialog.asksaveasfilename(parent=window, defaultextension=".json", filetypes=[("JSON", "*.json")])
+            if path:
+                self.instruments.dump_json(path)
+        
+        def toggle_profile():
+            if self.instruments.profiler is None:
+                self.instruments.start_profile()
+                profile_button.config(text="Stop Profile")
+                return
+            profile_button.config(text="Start Profile")
+            path = filedialog.asksaveasfilename(parent=window, defaultextension=".prof", filetypes=[("pstats", "*.prof")])
+            report = self.instruments.stop_profile(path or None)
+            
+            report_window = tk.Toplevel(window)
+            report_window.title("Profile")
+            text = tk.Text(report_window, wrap='none', width=120, height=40)
+            text.insert('end', report)
+            text.pack(fill='both', expand=True)
+        
+        button_frame = ttk.Frame(window, padding=10)
+        button_frame.pack(fill='x')
+        ttk.Button(button_frame, text="Refresh", command=refresh).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Reset", command=lambda: (self.instruments.reset(), refresh())).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Dump JSON", command=dump_json).pack(side='left', padx=5)
+        profile_button = ttk.Button(button_frame, text="Stop Profile" if self.instruments.profiler else "Start Profile",
+                                    command=toggle_profile)
+        profile_button.pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Close", command=window.destroy).pack(side='right', padx=5)
+        refresh()
     
     def login_as_customer(self):
         customer_id = simpledialog.askinteger("Login", "Enter your Customer ID:")
@@ -194,11 +1457,10 @@ class EcommerceGUI:
                 messagebox.showerror("Error", "Customer not found")
     
     def register_customer(self):
-        # Clear any existing widgets
-        for widget in self.root.winfo_children():
-            widget.destroy()
-            
-        frame = ttk.Frame(self.root, padding=20)
+        self.show_screen('register', self.build_register_screen)
+    
+    def build_register_screen(self, screen):
+        frame = ttk.Frame(screen, padding=20)
         frame.pack(expand=True)
         
         ttk.Label(frame, text="Register as Customer", font=("Arial", 16)).pack(pady=10)
@@ -223,6 +1485,8 @@ class EcommerceGUI:
             if name and contact and address:
                 customer_id = self.platform.add_customer(name, contact, address)
                 messagebox.showinfo("Success", "Registration successful! Your Customer ID is: {}".format(customer_id))
+                for var in (name_var, contact_var, address_var):
+                    var.set("")
                 self.platform.current_user = self.platform.get_customer(customer_id)
                 self.setup_customer_dashboard()
             else:
@@ -232,231 +1496,428 @@ class EcommerceGUI:
         ttk.Button(frame, text="Back", command=self.setup_login_screen).pack()
     
     def setup_customer_dashboard(self):
-        # Clear any existing widgets
-        for widget in self.root.winfo_children():
-            widget.destroy()
-            
-        frame = ttk.Frame(self.root, padding=20)
+        customer_id = self.platform.current_user['customer_id']
+        if self.dashboard_customer_id != customer_id and 'customer' in self.screens:
+            self.screens.pop('customer').destroy()
+        self.dashboard_customer_id = customer_id
+        self.show_screen('customer', self.build_customer_dashboard)
+    
+    def build_customer_dashboard(self, screen):
+        frame = ttk.Frame(screen, padding=20)
         frame.pack(fill='both', expand=True)
         
         customer = self.platform.current_user
         ttk.Label(frame, text="Welcome, {}!".format(customer['name']), font=("Arial", 16)).pack(pady=10)
         
-        # Create notebook (tabbed interface)
-        notebook = ttk.Notebook(frame)
+        # Create notebook (tabbed interface); each tab is built when first selected
+        notebook = LazyNotebook(frame)
         notebook.pack(fill='both', expand=True, pady=10)
         
         # Tab 1: Product Search
-        search_tab = ttk.Frame(notebook, padding=10)
-        notebook.add(search_tab, text="Search Products")
-        
-        search_frame = ttk.Frame(search_tab)
-        search_frame.pack(fill='x', pady=10)
-        
-        ttk.Label(search_frame, text="Search:").pack(side='left')
-        search_var = tk.StringVar()
-        ttk.Entry(search_frame, textvariable=search_var, width=40).pack(side='left', padx=5)
-        
-        # Create treeview for search results
-        columns = ('ID', 'Name', 'Price', 'Vendor', 'Tags')
-        search_tree = ttk.Treeview(search_tab, columns=columns, show='headings')
-        
-        # Define headings
-        for col in columns:
-            search_tree.heading(col, text=col)
-            search_tree.column(col, width=100)
-        
-        search_tree.pack(fill='both', expand=True)
-        
-        def search_products():
-            search_term = search_var.get()
-            if search_term:
-                # Clear previous results
-                for item in search_tree.get_children():
-                    search_tree.delete(item)
-                
-                results = self.platform.search_products(search_term)
-                for product in results:
-                    tags = [tag for tag in [product['tag1'], product['tag2'], product['tag3']] if tag]
-                    search_tree.insert('', 'end', values=(
-                        product['product_id'],
-                        product['name'],
-                        "${:.2f}".format(product['price']),
-                        product['vendor_name'],
-                        ", ".join(tags)
-                    ))
-        
-        def add_to_cart():
-            selected_item = search_tree.selection()
-            if not selected_item:
-                messagebox.showerror("Error", "Please select a product")
-                return
+        def build_search_tab(search_tab):
+            search_frame = ttk.Frame(search_tab)
+            search_frame.pack(fill='x', pady=10)
             
-            values = search_tree.item(selected_item, 'values')
-            product_id = int(values[0])
+            ttk.Label(search_frame, text="Search:").pack(side='left')
+            search_var = tk.StringVar()
+            ttk.Entry(search_frame, textvariable=search_var, width=40).pack(side='left', padx=5)
             
-            # If no current order, create one
-            if not self.platform.current_order:
-                order_id = self.platform.create_order(customer['customer_id'])
-                self.platform.current_order = order_id
+            # Filters and ordering
+            filter_frame = ttk.Frame(search_tab)
+            filter_frame.pack(fill='x', pady=(0, 10))
             
-            # Get vendor ID for the product
-            product = next((p for p in self.platform.products if p['product_id'] == product_id), None)
-            if product:
-                # Add to order
-                self.platform.add_to_order(self.platform.current_order, product_id, product['vendor_id'])
-                messagebox.showinfo("Success", "Product added to cart")
-            else:
-                messagebox.showerror("Error", "Product not found")
-        
-        button_frame = ttk.Frame(search_tab)
-        button_frame.pack(fill='x', pady=10)
+            min_price_var = tk.StringVar()
+            max_price_var = tk.StringVar()
+            tag_var = tk.StringVar()
+            region_var = tk.StringVar()
+            sort_var = tk.StringVar(value=SORTS[0])
+            my_region_var = tk.BooleanVar(value=True)
+            
+            ttk.Label(filter_frame, text="Price:").pack(side='left')
+            ttk.Entry(filter_frame, textvariable=min_price_var, width=8).pack(side='left', padx=2)
+            ttk.Label(filter_frame, text="to").pack(side='left')
+            ttk.Entry(filter_frame, textvariable=max_price_var, width=8).pack(side='left', padx=2)
+            ttk.Label(filter_frame, text="Tag:").pack(side='left', padx=(10, 0))
+            ttk.Entry(filter_frame, textvariable=tag_var, width=12).pack(side='left', padx=2)
+            ttk.Label(filter_frame, text="Region:").pack(side='left', padx=(10, 0))
+            ttk.Entry(filter_frame, textvariable=region_var, width=14).pack(side='left', padx=2)
+            ttk.Label(filter_frame, text="Sort:").pack(side='left', padx=(10, 0))
+            ttk.Combobox(filter_frame, textvariable=sort_var, values=SORTS, state='readonly', width=12).pack(side='left', padx=2)
+            ttk.Checkbutton(filter_frame, text="Ships to me", variable=my_region_var).pack(side='left', padx=(10, 0))
+            
+            facets_label = ttk.Label(search_tab, text="")
+            facets_label.pack(anchor='w')
+            
+            # Create treeview for search results
+            columns = ('ID', 'Name', 'Price', 'Vendor', 'Tags')
+            search_tree = ttk.Treeview(search_tab, columns=columns, show='headings')
+            
+            # Define headings
+            for col in columns:
+                search_tree.heading(col, text=col)
+                search_tree.column(col, width=100)
+            
+            search_tree.pack(fill='both', expand=True)
+            search_pager = PagedTreeview(search_tree, "search")
+            
+            also_bought_label = ttk.Label(search_tab, text="", wraplength=700)
+            also_bought_label.pack(anchor='w', pady=(5, 0))
+            
+            def search_row(product):
+                tags = [tag for tag in [product['tag1'], product['tag2'], product['tag3']] if tag]
+                return (
+                    product['product_id'],
+                    product['name'],
+                    "${:.2f}".format(product['price']),
+                    product['vendor_name'],
+                    ", ".join(tags)
+                )
+            
+            def price_filter(var):
+                try:
+                    return float(var.get()) if var.get().strip() else None
+                except ValueError:
+                    return None
+            
+            def show_facets(result):
+                tag_counts = sorted(result['facets']['tag'].items(), key=lambda entry: -entry[1])[:5]
+                tags = ", ".join("{} ({})".format(tag, count) for tag, count in tag_counts)
+                facets_label.config(text="{} matches{}".format(result['total'], "  Tags: " + tags if tags else ""))
+            
+            # A typed region wins; otherwise "Ships to me" scopes results to the
+            # region of the customer's shipping address, if it names one
+            def region_filter():
+                if region_var.get().strip():
+                    return region_var.get().strip()
+                if my_region_var.get():
+                    mask = self.platform.customer_region(customer['customer_id'])
+                    return mask if mask != ALL_REGIONS else None
+                return None
+            
+            def search_products():
+                search_term = search_var.get()
+                filters = {
+                    'min_price': price_filter(min_price_var),
+                    'max_price': price_filter(max_price_var),
+                    'tags': [tag_var.get().strip()] if tag_var.get().strip() else None,
+                }
+                if search_term.strip() or any(value is not None for value in filters.values()) or region_var.get().strip():
+                    filters['regions'] = region_filter()
+                    sort = sort_var.get()
+            
+                    # The first page comes with the total and facets. Later pages rank the
+                    # top offset + limit matches again, fetching at least twice as many ids
+                    # as are held so scrolling to the end ranks O(log n) times, not per page.
+                    def show_results(result):
+                        ranked = [result['product_ids']]
+            
+                        def fetch_page(offset, limit):
+                            if offset + limit > len(ranked[0]) and len(ranked[0]) < result['total']:
+                                ranked[0] = self.platform.query_products(
+                                    search_term, sort=sort, limit=max(offset + limit, 2 * len(ranked[0])),
+                                    facets=False, **filters)['product_ids']
+                            return self.platform.product_results(ranked[0][offset:offset + limit])
+            
+                        show_facets(result)
+                        search_pager.load(result['total'], fetch_page, search_row)
+            
+                    self.queries.submit('search', lambda: self.platform.query_products(
+                        search_term, sort=sort, limit=search_pager.page_size, **filters), show_results)
+                else:
+                    facets_label.config(text="")
+                    search_pager.clear()
+            
+            # Search as you type, once typing pauses
+            pending_search = [None]
+            
+            def on_search_changed(*args):
+                if pending_search[0]:
+                    search_tree.after_cancel(pending_search[0])
+                pending_search[0] = search_tree.after(SEARCH_DEBOUNCE_MS, search_products)
+            
+            for var in (search_var, min_price_var, max_price_var, tag_var, region_var, sort_var, my_region_var):
+                var.trace_add('write', on_search_changed)
+            
+            # Customers also bought, for the selected product
+            def show_also_bought(products):
+                names = ", ".join(product['name'] for product in products)
+                also_bought_label.config(text="Customers also bought: " + names if names else "")
+            
+            def on_product_selected(event):
+                selected_item = search_tree.selection()
+                if not selected_item:
+                    also_bought_label.config(text="")
+                    return
+                product_id = int(search_tree.item(selected_item[0], 'values')[0])
+                self.queries.submit('also_bought', lambda: self.platform.product_results(
+                    [other for other, count in self.platform.also_bought(product_id, 5)]), show_also_bought)
+            
+            search_tree.bind('<<TreeviewSelect>>', on_product_selected)
+            
+            quantity_var = tk.StringVar(value="1")
+            
+            # Adds every selected product in one call; Ctrl/Shift-click selects several
+            def add_to_cart():
+                selected_items = search_tree.selection()
+                if not selected_items:
+                    messagebox.showerror("Error", "Please select a product")
+                    return
+                try:
+                    quantity = int(quantity_var.get())
+                except ValueError:
+                    quantity = 0
+                if quantity < 1:
+                    messagebox.showerror("Error", "Quantity must be a whole number of at least 1")
+                    return
+            
+                product_ids = [int(search_tree.item(row, 'values')[0]) for row in selected_items]
+            
+                # If no current order, create one
+                if not self.platform.current_order:
+                    order_id = self.platform.create_order(customer['customer_id'])
+                    self.platform.current_order = order_id
+            
+                try:
+                    self.platform.add_items_to_order(self.platform.current_order,
+                                                     [(product_id, quantity) for product_id in product_ids])
+                except OrderError as error:
+                    messagebox.showerror("Error", str(error))
+                    return
+                cart_status_label.config(text="Added {} product{} to cart".format(
+                    len(product_ids), "" if len(product_ids) == 1 else "s"))
+            
+            button_frame = ttk.Frame(search_tab)
+            button_frame.pack(fill='x', pady=10)
+            
+            ttk.Button(button_frame, text="Search", command=search_products).pack(side='left', padx=5)
+            ttk.Label(button_frame, text="Quantity:").pack(side='left', padx=(10, 0))
+            ttk.Spinbox(button_frame, from_=1, to=99, textvariable=quantity_var, width=4).pack(side='left', padx=2)
+            ttk.Button(button_frame, text="Add to Cart", command=add_to_cart).pack(side='left', padx=5)
+            cart_status_label = ttk.Label(button_frame, text="")
+            cart_status_label.pack(side='left', padx=5)
         
-        ttk.Button(button_frame, text="Search", command=search_products).pack(side='left', padx=5)
-        ttk.Button(button_frame, text="Add to Cart", command=add_to_cart).pack(side='left', padx=5)
+        notebook.add_lazy(build_search_tab, text="Search Products")
         
         # Tab 2: Cart / Current Order
-        cart_tab = ttk.Frame(notebook, padding=10)
-        notebook.add(cart_tab, text="Shopping Cart")
-        
-        # Create treeview for cart items
-        cart_columns = ('Item ID', 'Product', 'Price', 'Vendor', 'Quantity')
-        cart_tree = ttk.Treeview(cart_tab, columns=cart_columns, show='headings')
-        
-        # Define headings
-        for col in cart_columns:
-            cart_tree.heading(col, text=col)
-            cart_tree.column(col, width=100)
-        
-        cart_tree.pack(fill='both', expand=True)
-        
-        def refresh_cart():
-            # Clear previous items
-            for item in cart_tree.get_children():
-                cart_tree.delete(item)
-            
-            if self.platform.current_order:
-                items = self.platform.get_order_items(self.platform.current_order)
-                for item in items:
-                    cart_tree.insert('', 'end', values=(
-                        item['order_item_id'],
-                        item['product_name'],
-                        "${:.2f}".format(item['price']),
-                        item['vendor_name'],
-                        item['quantity']
-                    ))
-        
-        def remove_from_cart():
-            selected_item = cart_tree.selection()
-            if not selected_item:
-                messagebox.showerror("Error", "Please select an item to remove")
-                return
+        def build_cart_tab(cart_tab):
+            # Create treeview for cart items
+            cart_columns = ('Item ID', 'Product', 'Price', 'Vendor', 'Quantity')
+            cart_tree = ttk.Treeview(cart_tab, columns=cart_columns, show='headings')
+            
+            # Define headings
+            for col in cart_columns:
+                cart_tree.heading(col, text=col)
+                cart_tree.column(col, width=100)
+            
+            cart_tree.pack(fill='both', expand=True)
+            cart_pager = PagedTreeview(cart_tree, "cart")
             
-            item_id = int(cart_tree.item(selected_item, 'values')[0])
-            self.platform.remove_from_order(item_id)
+            def cart_row(item):
+                return (
+                    item['order_item_id'],
+                    item['product_name'],
+                    "${:.2f}".format(item['unit_price']),
+                    item['vendor_name'],
+                    item['quantity']
+                )
+            
+            def cart_key(item):
+                return item['order_item_id']
+            
+            def refresh_cart():
+                order_id = self.platform.current_order
+                if order_id:
+                    self.queries.submit(
+                        'cart',
+                        lambda: self.platform.get_order_items(order_id),
+                        lambda items: cart_pager.load(len(items), paged_list(items), cart_row, cart_key)
+                    )
+                else:
+                    cart_pager.load(0, paged_list([]), cart_row, cart_key)
+            
+            # Items added or removed anywhere show up without reloading the cart
+            self.feed.listen(('order_items',), lambda changes: apply_changes(
+                cart_pager, changes, lambda item: item['order_id'] == self.platform.current_order), cart_tree)
+            
+            def remove_from_cart():
+                selected_item = cart_tree.selection()
+                if not selected_item:
+                    messagebox.showerror("Error", "Please select an item to remove")
+                    return
+            
+                item_id = int(cart_tree.item(selected_item, 'values')[0])
+                try:
+                    self.platform.remove_from_order(item_id)
+                except OrderError as error:
+                    messagebox.showerror("Error", str(error))
+                    return
+                messagebox.showinfo("Success", "Item removed from cart")
+            
+            def set_quantity():
+                selected_items = cart_tree.selection()
+                order_id = self.platform.current_order
+                if not selected_items or not order_id:
+                    messagebox.showerror("Error", "Please select an item")
+                    return
+            
+                quantity = simpledialog.askinteger("Quantity", "New quantity (0 removes the item):",
+                                                   parent=self.root, minvalue=0)
+                if quantity is None:
+                    return
+                products = {item['order_item_id']: item['product_id'] for item in self.platform.get_order_items(order_id)}
+                item_ids = [int(cart_tree.item(row, 'values')[0]) for row in selected_items]
+                try:
+                    self.platform.set_order_quantities(
+                        order_id, [(products[item_id], quantity) for item_id in item_ids if item_id in products])
+                except OrderError as error:
+                    messagebox.showerror("Error", str(error))
+            
+            def cancel_order():
+                if self.platform.current_order:
+                    try:
+                        self.platform.cancel_order(self.platform.current_order)
+                    except OrderError as error:
+                        messagebox.showerror("Error", str(error))
+                        return
+                    self.platform.current_order = None
+                    refresh_cart()
+                    messagebox.showinfo("Success", "Order cancelled")
+                else:
+                    messagebox.showinfo("Info", "No active order to cancel")
+            
+            def checkout():
+                if self.platform.current_order:
+                    # Validate the items, freeze their prices and complete the order
+                    try:
+                        self.platform.checkout_order(self.platform.current_order)
+                    except OrderError as error:
+                        messagebox.showerror("Error", str(error))
+                        return
+            
+                    messagebox.showinfo("Success", "Order completed successfully!")
+                    self.platform.current_order = None
+                    refresh_cart()
+                else:
+                    messagebox.showinfo("Info", "No items in cart to checkout")
+            
+            cart_button_frame = ttk.Frame(cart_tab)
+            cart_button_frame.pack(fill='x', pady=10)
+            
+            ttk.Button(cart_button_frame, text="Refresh Cart", command=refresh_cart).pack(side='left', padx=5)
+            ttk.Button(cart_button_frame, text="Set Quantity", command=set_quantity).pack(side='left', padx=5)
+            ttk.Button(cart_button_frame, text="Remove Item", command=remove_from_cart).pack(side='left', padx=5)
+            ttk.Button(cart_button_frame, text="Cancel Order", command=cancel_order).pack(side='left', padx=5)
+            ttk.Button(cart_button_frame, text="Checkout", command=checkout).pack(side='left', padx=5)
             refresh_cart()
-            messagebox.showinfo("Success", "Item removed from cart")
-        
-        def cancel_order():
-            if self.platform.current_order:
-                self.platform.cancel_order(self.platform.current_order)
-                self.platform.current_order = None
-                refresh_cart()
-                messagebox.showinfo("Success", "Order cancelled")
-            else:
-                messagebox.showinfo("Info", "No active order to cancel")
-        
-        def checkout():
-            if self.platform.current_order:
-                # Update order status to completed
-                for order in self.platform.orders:
-                    if order['order_id'] == self.platform.current_order:
-                        order['status'] = 'completed'
-                        break
-                
-                messagebox.showinfo("Success", "Order completed successfully!")
-                self.platform.current_order = None
-                refresh_cart()
-            else:
-                messagebox.showinfo("Info", "No items in cart to checkout")
-        
-        cart_button_frame = ttk.Frame(cart_tab)
-        cart_button_frame.pack(fill='x', pady=10)
         
-        ttk.Button(cart_button_frame, text="Refresh Cart", command=refresh_cart).pack(side='left', padx=5)
-        ttk.Button(cart_button_frame, text="Remove Item", command=remove_from_cart).pack(side='left', padx=5)
-        ttk.Button(cart_button_frame, text="Cancel Order", command=cancel_order).pack(side='left', padx=5)
-        ttk.Button(cart_button_frame, text="Checkout", command=checkout).pack(side='left', padx=5)
+        notebook.add_lazy(build_cart_tab, text="Shopping Cart")
         
         # Tab 3: Order History
-        history_tab = ttk.Frame(notebook, padding=10)
-        notebook.add(history_tab, text="Order History")
-        
-        # Create treeview for order history
-        history_columns = ('Order ID', 'Date', 'Status')
-        history_tree = ttk.Treeview(history_tab, columns=history_columns, show='headings')
-        
-        # Define headings
-        for col in history_columns:
-            history_tree.heading(col, text=col)
-        
-        history_tree.pack(fill='both', expand=True)
-        
-        def load_order_history():
-            # Clear previous items
-            for item in history_tree.get_children():
-                history_tree.delete(item)
+        def build_history_tab(history_tab):
+            # Create treeview for order history
+            history_columns = ('Order ID', 'Date', 'Status')
+            history_tree = ttk.Treeview(history_tab, columns=history_columns, show='headings')
+            
+            # Define headings
+            for col in history_columns:
+                history_tree.heading(col, text=col)
             
-            orders = self.platform.get_customer_orders(customer['customer_id'])
-            for order in orders:
-                history_tree.insert('', 'end', values=(
+            history_tree.pack(fill='both', expand=True)
+            history_pager = PagedTreeview(history_tree, "history")
+            
+            def history_row(order):
+                return (
                     order['order_id'],
-                    order['order_date'],
+                    format_timestamp(order['order_date']),
                     order['status']
-                ))
-        
-        def view_order_details():
-            selected_item = history_tree.selection()
-            if not selected_item:
-                messagebox.showerror("Error", "Please select an order to view")
-                return
+                )
             
-            order_id = int(history_tree.item(selected_item, 'values')[0])
-            items = self.platform.get_order_items(order_id)
+            def load_order_history():
+                customer_id = customer['customer_id']
+                history_pager.load(
+                    self.platform.count_customer_orders(customer_id),
+                    lambda offset, limit: self.platform.get_customer_orders(customer_id, offset, limit),
+                    history_row,
+                    lambda order: order['order_id']
+                )
             
-            # Create a pop-up window with order details
-            details_window = tk.Toplevel(self.root)
-            details_window.title("Order Details")
-            details_window.geometry("600x400")
+            # New orders appear at the top and status changes update their row
+            self.feed.listen(('orders',), lambda changes: apply_changes(
+                history_pager, changes, lambda order: order['customer_id'] == customer['customer_id'], at_top=True), history_tree)
             
-            ttk.Label(details_window, text="Order #{} Details".format(order_id), font=("Arial", 14)).pack(pady=10)
+            def view_order_details():
+                selected_item = history_tree.selection()
+                if not selected_item:
+                    messagebox.showerror("Error", "Please select an order to view")
+                    return
             
-            # Create treeview for order items
-            columns = ('Product', 'Price', 'Vendor', 'Quantity')
-            details_tree = ttk.Treeview(details_window, columns=columns, show='headings')
+                order_id = int(history_tree.item(selected_item, 'values')[0])
             
-            # Define headings
-            for col in columns:
-                details_tree.heading(col, text=col)
+                # Create a pop-up window with order details
+                details_window = tk.Toplevel(self.root)
+                details_window.title("Order Details")
+                details_window.geometry("600x400")
             
-            details_tree.pack(fill='both', expand=True, padx=20, pady=10)
+                ttk.Label(details_window, text="Order #{} Details".format(order_id), font=("Arial", 14)).pack(pady=10)
             
-            # Insert order items
-            for item in items:
-                details_tree.insert('', 'end', values=(
-                    item['product_name'],
-                    "${:.2f}".format(item['price']),
-                    item['vendor_name'],
-                    item['quantity']
-                ))
+                # Create treeview for order items
+                columns = ('Product', 'Price', 'Vendor', 'Quantity')
+                details_tree = ttk.Treeview(details_window, columns=columns, show='headings')
             
-            ttk.Button(details_window, text="Close", command=details_window.destroy).pack(pady=10)
-        
-        history_button_frame = ttk.Frame(history_tab)
-        history_button_frame.pack(fill='x', pady=10)
+                # Define headings
+                for col in columns:
+                    details_tree.heading(col, text=col)
+            
+                details_tree.pack(fill='both', expand=True, padx=20, pady=10)
+            
+                # Insert order items
+                details_pager = PagedTreeview(details_tree, "order_details")
+                self.queries.submit(
+                    ('order_details', order_id),
+                    lambda: self.platform.get_order_items(order_id),
+                    lambda items: details_pager.load(len(items), paged_list(items), lambda item: (
+                        item['product_name'],
+                        "${:.2f}".format(item['unit_price']),
+                        item['vendor_name'],
+                        item['quantity']
+                    ), lambda item: item['order_item_id'])
+                )
+                self.feed.listen(('order_items',), lambda changes: apply_changes(
+                    details_pager, changes, lambda item: item['order_id'] == order_id), details_window)
+            
+                ttk.Button(details_window, text="Close", command=details_window.destroy).pack(pady=10)
+            
+            def rate_order_vendors():
+                selected_item = history_tree.selection()
+                if not selected_item:
+                    messagebox.showerror("Error", "Please select an order to rate")
+                    return
+            
+                order_id = int(history_tree.item(selected_item, 'values')[0])
+                vendor_ids = self.platform.rateable_vendors(order_id)
+                if not vendor_ids:
+                    messagebox.showinfo("Rate Vendors", "There is nothing to rate in this order")
+                    return
+            
+                for vendor_id in vendor_ids:
+                    rating = simpledialog.askinteger(
+                        "Rate Vendor", "Rate {} from {} to {}:".format(self.platform.vendor_names.get(vendor_id), MIN_RATING, MAX_RATING),
+                        parent=self.root, minvalue=MIN_RATING, maxvalue=MAX_RATING)
+                    if rating is None:
+                        continue
+                    try:
+                        self.platform.rate_vendor(order_id, vendor_id, rating)
+                    except OrderError as error:
+                        messagebox.showerror("Error", str(error))
+            
+            history_button_frame = ttk.Frame(history_tab)
+            history_button_frame.pack(fill='x', pady=10)
+            
+            ttk.Button(history_button_frame, text="Load Order History", command=load_order_history).pack(side='left', padx=5)
+            ttk.Button(history_button_frame, text="View Details", command=view_order_details).pack(side='left', padx=5)
+            ttk.Button(history_button_frame, text="Rate Vendors", command=rate_order_vendors).pack(side='left', padx=5)
         
-        ttk.Button(history_button_frame, text="Load Order History", command=load_order_history).pack(side='left', padx=5)
-        ttk.Button(history_button_frame, text="View Details", command=view_order_details).pack(side='left', padx=5)
+        notebook.add_lazy(build_history_tab, text="Order History")
         
         # Bottom buttons
         bottom_frame = ttk.Frame(frame)
@@ -465,158 +1926,173 @@ class EcommerceGUI:
         ttk.Button(bottom_frame, text="Logout", command=self.setup_login_screen).pack(side='right')
     
     def vendor_management(self):
-        # Clear any existing widgets
-        for widget in self.root.winfo_children():
-            widget.destroy()
-            
-        frame = ttk.Frame(self.root, padding=20)
+        self.show_screen('vendor', self.build_vendor_management)
+    
+    def build_vendor_management(self, screen):
+        frame = ttk.Frame(screen, padding=20)
         frame.pack(fill='both', expand=True)
         
         ttk.Label(frame, text="Vendor Management", font=("Arial", 16)).pack(pady=10)
         
-        # Create notebook (tabbed interface)
-        notebook = ttk.Notebook(frame)
+        # Create notebook (tabbed interface); each tab is built when first selected
+        notebook = LazyNotebook(frame)
         notebook.pack(fill='both', expand=True, pady=10)
         
         # Tab 1: List Vendors
-        vendors_tab = ttk.Frame(notebook, padding=10)
-        notebook.add(vendors_tab, text="List Vendors")
-        
-        # Create treeview for vendors
-        columns = ('ID', 'Business Name', 'Feedback Score', 'Location')
-        vendors_tree = ttk.Treeview(vendors_tab, columns=columns, show='headings')
-        
-        # Define headings
-        for col in columns:
-            vendors_tree.heading(col, text=col)
-        
-        vendors_tree.pack(fill='both', expand=True)
-        
-        def load_vendors():
-            # Clear previous items
-            for item in vendors_tree.get_children():
-                vendors_tree.delete(item)
+        def build_vendors_tab(vendors_tab):
+            # Create treeview for vendors
+            columns = ('ID', 'Business Name', 'Feedback Score', 'Ratings', 'Location')
+            vendors_tree = ttk.Treeview(vendors_tab, columns=columns, show='headings')
             
-            vendors = self.platform.list_all_vendors()
-            for vendor in vendors:
-                vendors_tree.insert('', 'end', values=(
+            # Define headings
+            for col in columns:
+                vendors_tree.heading(col, text=col)
+            
+            vendors_tree.pack(fill='both', expand=True)
+            vendors_pager = PagedTreeview(vendors_tree, "vendors")
+            
+            def vendor_row(vendor):
+                return (
                     vendor['vendor_id'],
                     vendor['business_name'],
-                    vendor['feedback_score'],
+                    "{:.2f}".format(vendor['feedback_score']),
+                    self.platform.vendor_ratings.counts.get(vendor['vendor_id'], 0),
                     vendor['geographical_presence']
-                ))
-        
-        def view_vendor_products():
-            selected_item = vendors_tree.selection()
-            if not selected_item:
-                messagebox.showerror("Error", "Please select a vendor")
-                return
+                )
             
-            vendor_id = int(vendors_tree.item(selected_item, 'values')[0])
-            products = self.platform.list_vendor_products(vendor_id)
+            # Best rated vendors first; rows update as ratings arrive, the order on reload.
+            # Pages come from one snapshot of the ranking, so a rating between two pages
+            # cannot bring a vendor that is already listed onto the next page.
+            def load_vendors():
+                self.queries.submit('vendors', self.platform.top_vendors, lambda vendors: vendors_pager.load(
+                    len(vendors), paged_list(vendors), vendor_row, lambda vendor: vendor['vendor_id']))
             
-            # Create a pop-up window with products
-            products_window = tk.Toplevel(self.root)
-            products_window.title("Vendor Products")
-            products_window.geometry("700x400")
+            self.feed.listen(('vendors',), lambda changes: apply_changes(
+                vendors_pager, changes, lambda vendor: True), vendors_tree)
             
-            vendor_name = vendors_tree.item(selected_item, 'values')[1]
-            ttk.Label(products_window, text="{} Products".format(vendor_name), font=("Arial", 14)).pack(pady=10)
+            def view_vendor_products():
+                selected_item = vendors_tree.selection()
+                if not selected_item:
+                    messagebox.showerror("Error", "Please select a vendor")
+                    return
             
-            # Create treeview for products
-            columns = ('ID', 'Name', 'Price', 'Tag 1', 'Tag 2', 'Tag 3')
-            products_tree = ttk.Treeview(products_window, columns=columns, show='headings')
+                vendor_id = int(vendors_tree.item(selected_item, 'values')[0])
             
-            # Define headings
-            for col in columns:
-                products_tree.heading(col, text=col)
+                # Create a pop-up window with products
+                products_window = tk.Toplevel(self.root)
+                products_window.title("Vendor Products")
+                products_window.geometry("700x400")
             
-            products_tree.pack(fill='both', expand=True, padx=20, pady=10)
+                vendor_name = vendors_tree.item(selected_item, 'values')[1]
+                ttk.Label(products_window, text="{} Products".format(vendor_name), font=("Arial", 14)).pack(pady=10)
             
-            # Insert products
-            for product in products:
-                products_tree.insert('', 'end', values=(
-                    product['product_id'],
-                    product['name'],
-                    "${:.2f}".format(product['price']),
-                    product['tag1'] or "",
-                    product['tag2'] or "",
-                    product['tag3'] or ""
-                ))
+                # Create treeview for products
+                columns = ('ID', 'Name', 'Price', 'Tag 1', 'Tag 2', 'Tag 3')
+                products_tree = ttk.Treeview(products_window, columns=columns, show='headings')
             
-            ttk.Button(products_window, text="Close", command=products_window.destroy).pack(pady=10)
-        
-        vendors_button_frame = ttk.Frame(vendors_tab)
-        vendors_button_frame.pack(fill='x', pady=10)
+                # Define headings
+                for col in columns:
+                    products_tree.heading(col, text=col)
+            
+                products_tree.pack(fill='both', expand=True, padx=20, pady=10)
+            
+                # Insert products
+                products_pager = PagedTreeview(products_tree, "vendor_products")
+                self.queries.submit(
+                    ('vendor_products', vendor_id),
+                    lambda: self.platform.list_vendor_products(vendor_id),
+                    lambda products: products_pager.load(len(products), paged_list(products), lambda product: (
+                        product['product_id'],
+                        product['name'],
+                        "${:.2f}".format(product['price']),
+                        product['tag1'] or "",
+                        product['tag2'] or "",
+                        product['tag3'] or ""
+                    ), lambda product: product['product_id'])
+                )
+                self.feed.listen(('products',), lambda changes: apply_changes(
+                    products_pager, changes, lambda product: product['vendor_id'] == vendor_id), products_window)
+            
+                ttk.Button(products_window, text="Close", command=products_window.destroy).pack(pady=10)
+            
+            vendors_button_frame = ttk.Frame(vendors_tab)
+            vendors_button_frame.pack(fill='x', pady=10)
+            
+            ttk.Button(vendors_button_frame, text="Load Vendors", command=load_vendors).pack(side='left', padx=5)
+            ttk.Button(vendors_button_frame, text="View Products", command=view_vendor_products).pack(side='left', padx=5)
         
-        ttk.Button(vendors_button_frame, text="Load Vendors", command=load_vendors).pack(side='left', padx=5)
-        ttk.Button(vendors_button_frame, text="View Products", command=view_vendor_products).pack(side='left', padx=5)
+        notebook.add_lazy(build_vendors_tab, text="List Vendors")
         
         # Tab 2: Add Vendor
-        add_vendor_tab = ttk.Frame(notebook, padding=10)
-        notebook.add(add_vendor_tab, text="Add Vendor")
-        
-        ttk.Label(add_vendor_tab, text="Business Name:").pack(anchor='w')
-        business_name_var = tk.StringVar()
-        ttk.Entry(add_vendor_tab, textvariable=business_name_var, width=40).pack(pady=5, fill='x')
-        
-        ttk.Label(add_vendor_tab, text="Geographical Presence:").pack(anchor='w')
-        location_var = tk.StringVar()
-        ttk.Entry(add_vendor_tab, textvariable=location_var, width=40).pack(pady=5, fill='x')
-        
-        def submit_vendor():
-            business_name = business_name_var.get()
-            location = location_var.get()
-            
-            if business_name and location:
-                vendor_id = self.platform.add_vendor(business_name, location)
-                messagebox.showinfo("Success", "Vendor added successfully! Vendor ID: {}".format(vendor_id))
-                business_name_var.set("")
-                location_var.set("")
-            else:
-                messagebox.showerror("Error", "All fields are required")
+        def build_add_vendor_tab(add_vendor_tab):
+            ttk.Label(add_vendor_tab, text="Business Name:").pack(anchor='w')
+            business_name_var = tk.StringVar()
+            ttk.Entry(add_vendor_tab, textvariable=business_name_var, width=40).pack(pady=5, fill='x')
+            
+            ttk.Label(add_vendor_tab, text="Geographical Presence:").pack(anchor='w')
+            location_var = tk.StringVar()
+            ttk.Entry(add_vendor_tab, textvariable=location_var, width=40).pack(pady=5, fill='x')
+            
+            def submit_vendor():
+                business_name = business_name_var.get()
+                location = location_var.get()
+            
+                if business_name and location:
+                    vendor_id = self.platform.add_vendor(business_name, location)
+                    messagebox.showinfo("Success", "Vendor added successfully! Vendor ID: {}".format(vendor_id))
+                    business_name_var.set("")
+                    location_var.set("")
+                else:
+                    messagebox.showerror("Error", "All fields are required")
+            
+            ttk.Button(add_vendor_tab, text="Add Vendor", command=submit_vendor).pack(pady=10)
         
-        ttk.Button(add_vendor_tab, text="Add Vendor", command=submit_vendor).pack(pady=10)
+        notebook.add_lazy(build_add_vendor_tab, text="Add Vendor")
         
         # Tab 3: Add Product
-        add_product_tab = ttk.Frame(notebook, padding=10)
-        notebook.add(add_product_tab, text="Add Product")
-        
-        ttk.Label(add_product_tab, text="Vendor ID:").pack(anchor='w')
-        vendor_id_var = tk.StringVar()
-        ttk.Entry(add_product_tab, textvariable=vendor_id_var, width=40).pack(pady=5, fill='x')
-        
-        ttk.Label(add_product_tab, text="Product Name:").pack(anchor='w')
-        product_name_var = tk.StringVar()
-        ttk.Entry(add_product_tab, textvariable=product_name_var, width=40).pack(pady=5, fill='x')
-        
-        ttk.Label(add_product_tab, text="Price:").pack(anchor='w')
-        price_var = tk.StringVar()
-        ttk.Entry(add_product_tab, textvariable=price_var, width=40).pack(pady=5, fill='x')
-        
-        ttk.Label(add_product_tab, text="Tag 1:").pack(anchor='w')
-        tag1_var = tk.StringVar()
-        ttk.Entry(add_product_tab, textvariable=tag1_var, width=40).pack(pady=5, fill='x')
-        
-        ttk.Label(add_product_tab, text="Tag 2:").pack(anchor='w')
-        tag2_var = tk.StringVar()
-        ttk.Entry(add_product_tab, textvariable=tag2_var, width=40).pack(pady=5, fill='x')
-        
-        ttk.Label(add_product_tab, text="Tag 3:").pack(anchor='w')
-        tag3_var = tk.StringVar()
-        ttk.Entry(add_product_tab, textvariable=tag3_var, width=40).pack(pady=5, fill='x')
-        
-        def submit_product():
-            try:
-                vendor_id = int(vendor_id_var.get())
+        def build_add_product_tab(add_product_tab):
+            ttk.Label(add_product_tab, text="Vendor ID:").pack(anchor='w')
+            vendor_id_var = tk.StringVar()
+            ttk.Entry(add_product_tab, textvariable=vendor_id_var, width=40).pack(pady=5, fill='x')
+            
+            ttk.Label(add_product_tab, text="Product Name:").pack(anchor='w')
+            product_name_var = tk.StringVar()
+            ttk.Entry(add_product_tab, textvariable=product_name_var, width=40).pack(pady=5, fill='x')
+            
+            ttk.Label(add_product_tab, text="Price:").pack(anchor='w')
+            price_var = tk.StringVar()
+            ttk.Entry(add_product_tab, textvariable=price_var, width=40).pack(pady=5, fill='x')
+            
+            ttk.Label(add_product_tab, text="Tag 1:").pack(anchor='w')
+            tag1_var = tk.StringVar()
+            ttk.Entry(add_product_tab, textvariable=tag1_var, width=40).pack(pady=5, fill='x')
+            
+            ttk.Label(add_product_tab, text="Tag 2:").pack(anchor='w')
+            tag2_var = tk.StringVar()
+            ttk.Entry(add_product_tab, textvariable=tag2_var, width=40).pack(pady=5, fill='x')
+            
+            ttk.Label(add_product_tab, text="Tag 3:").pack(anchor='w')
+            tag3_var = tk.StringVar()
+            ttk.Entry(add_product_tab, textvariable=tag3_var, width=40).pack(pady=5, fill='x')
+            
+            def submit_product():
+                try:
+                    vendor_id = int(vendor_id_var.get())
+                    price = float(price_var.get())
+                except ValueError:
+                    messagebox.showerror("Error", "Please enter valid values")
+                    return
                 name = product_name_var.get()
-                price = float(price_var.get())
                 tag1 = tag1_var.get() if tag1_var.get() else None
                 tag2 = tag2_var.get() if tag2_var.get() else None
                 tag3 = tag3_var.get() if tag3_var.get() else None
-                
+            
                 if vendor_id and name and price:
-                    product_id = self.platform.add_product(vendor_id, name, price, tag1, tag2, tag3)
+                    try:
+                        product_id = self.platform.add_product(vendor_id, name, price, tag1, tag2, tag3)
+                    except ValueError as error:
+                        messagebox.showerror("Error", str(error))
+                        return
                     messagebox.showinfo("Success", "Product added successfully! Product ID: {}".format(product_id))
                     product_name_var.set("")
                     price_var.set("")
@@ -625,10 +2101,74 @@ class EcommerceGUI:
                     tag3_var.set("")
                 else:
                     messagebox.showerror("Error", "Vendor ID, name and price are required")
-            except ValueError:
-                messagebox.showerror("Error", "Please enter valid values")
+            
+            ttk.Button(add_product_tab, text="Add Product", command=submit_product).pack(pady=10)
+        
+        notebook.add_lazy(build_add_product_tab, text="Add Product")
+        
+        # Tab 4: Sales Dashboard
+        def build_dashboard_tab(dashboard_tab):
+            summary_label = ttk.Label(dashboard_tab, text="", justify='left')
+            summary_label.pack(anchor='w', pady=5)
+            
+            group_frame = ttk.Frame(dashboard_tab)
+            group_frame.pack(fill='x', pady=5)
+            
+            ttk.Label(group_frame, text="Revenue by:").pack(side='left')
+            group_var = tk.StringVar(value='vendor')
+            ttk.Combobox(group_frame, textvariable=group_var, values=GROUPS, state='readonly', width=10).pack(side='left', padx=5)
+            
+            # Create treeview for grouped revenue
+            dashboard_columns = ('Group', 'Revenue')
+            dashboard_tree = ttk.Treeview(dashboard_tab, columns=dashboard_columns, show='headings')
+            
+            # Define headings
+            for col in dashboard_columns:
+                dashboard_tree.heading(col, text=col)
+            
+            dashboard_tree.pack(fill='both', expand=True)
+            dashboard_pager = PagedTreeview(dashboard_tree, "dashboard")
+            
+            def show_summary(summary):
+                lines = []
+                for status, count in sorted(summary['status_counts'].items()):
+                    lines.append("{}: {} orders, ${:.2f}".format(status.capitalize(), count, summary['status_totals'].get(status, 0.0)))
+                top_vendors = ", ".join("{} (${:.2f})".format(self.platform.get_vendor(vendor_id)['business_name'], revenue)
+                                        for vendor_id, revenue in summary['top_vendors'][:3])
+                lines.append("Top vendors: {}".format(top_vendors or "none yet"))
+                summary_label.config(text="\n".join(lines))
+            
+            def show_revenue(group, revenue):
+                rows = sorted(revenue.items(), key=lambda entry: entry[1], reverse=True)
+            
+                def revenue_row(row):
+                    key, total = row
+                    if group == 'vendor':
+                        vendor = self.platform.get_vendor(key)
+                        key = vendor['business_name'] if vendor else key
+                    return (key, "${:.2f}".format(total))
+            
+                dashboard_pager.load(len(rows), paged_list(rows), revenue_row)
+            
+            dashboard_loaded = [False]
+            
+            def refresh_dashboard():
+                dashboard_loaded[0] = True
+                group = group_var.get()
+                self.queries.submit('dashboard_summary', self.platform.get_sales_summary, show_summary)
+                self.queries.submit(
+                    'dashboard_revenue',
+                    lambda: self.platform.get_revenue_by(group),
+                    lambda revenue: show_revenue(group, revenue)
+                )
+            
+            ttk.Button(dashboard_tab, text="Refresh", command=refresh_dashboard).pack(pady=10)
+            
+            # Totals are re-queried at most once per frame while orders change
+            self.feed.listen(('orders', 'order_items'), lambda changes: dashboard_loaded[0] and refresh_dashboard(),
+                             dashboard_tree)
         
-        ttk.Button(add_product_tab, text="Add Product", command=submit_product).pack(pady=10)
+        notebook.add_lazy(build_dashboard_tab, text="Sales Dashboard")
         
         # Bottom buttons
         bottom_frame = ttk.Frame(frame)
@@ -0,0 +1,125 @@
+import heapq
+
+from records import format_timestamp
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Ways sales can be grouped in SalesAnalytics.revenue_by
+GROUPS = ('vendor', 'tag', 'day', 'status')
+
+
+class SalesAnalytics:
+    # Sales figures for an EcommercePlatform. Running totals are updated by the
+    # platform on every cart and order status change; grouped reports are
+    # computed in one batch over all order lines (with NumPy when available).
+    def __init__(self, platform):
+        self.platform = platform
+        self.order_totals = {}
+        self.status_totals = {}
+        self.status_counts = {}
+        self.vendor_revenue = {}
+        self.product_revenue = {}
+
+    # Running totals
+    def _line_total(self, item):
+        if item['unit_price'] is not None:
+            return item['unit_price'] * item['quantity']
+        product = self.platform.product_index.get(item['product_id'])
+        return product['price'] * item['quantity'] if product else 0.0
+
+    def _add(self, totals, key, amount):
+        totals[key] = totals.get(key, 0) + amount
+
+    def _add_completed_line(self, item, amount):
+        self._add(self.vendor_revenue, item['vendor_id'], amount)
+        self._add(self.product_revenue, item['product_id'], amount)
+
+    def order_added(self, order):
+        self.order_totals[order['order_id']] = 0.0
+        self._add(self.status_counts, order['status'], 1)
+        self._add(self.status_totals, order['status'], 0.0)
+
+    def item_added(self, item):
+        self._item_changed(item, self._line_total(item))
+
+    def item_removed(self, item):
+        self._item_changed(item, -self._line_total(item))
+
+    def _item_changed(self, item, amount):
+        order = self.platform.order_index.get(item['order_id'])
+        if not order:
+            return
+        self._add(self.order_totals, order['order_id'], amount)
+        self._add(self.status_totals, order['status'], amount)
+        if order['status'] == 'completed':
+            self._add_completed_line(item, amount)
+
+    def status_changed(self, order, old_status):
+        new_status = order['status']
+        if new_status == old_status:
+            return
+        total = self.order_totals.get(order['order_id'], 0.0)
+        self._add(self.status_counts, old_status, -1)
+        self._add(self.status_counts, new_status, 1)
+        self._add(self.status_totals, old_status, -total)
+        self._add(self.status_totals, new_status, total)
+
+        # Vendor and product revenue only count completed orders
+        if 'completed' in (old_status, new_status):
+            sign = 1 if new_status == 'completed' else -1
+            for item in self.platform.order_items_by_order.get(order['order_id'], {}).values():
+                self._add_completed_line(item, sign * self._line_total(item))
+
+    def top_products(self, n=10):
+        return heapq.nlargest(n, self.product_revenue.items(), key=lambda entry: entry[1])
+
+    def top_vendors(self, n=10):
+        return heapq.nlargest(n, self.vendor_revenue.items(), key=lambda entry: entry[1])
+
+    # Batch reports
+    def _order_lines(self, statuses):
+        # Yields (order, product, line total) for order lines in the given statuses
+        platform = self.platform
+        if platform.instruments:
+            platform.instruments.scanned(len(platform.order_items))
+        for item in platform.order_items:
+            order = platform.order_index.get(item['order_id'])
+            product = platform.product_index.get(item['product_id'])
+            if order and product and (statuses is None or order['status'] in statuses):
+                yield order, product, self._line_total(item)
+
+    def _group_key(self, group, order, product):
+        if group == 'vendor':
+            return (product['vendor_id'],)
+        if group == 'tag':
+            return tuple(tag for tag in (product['tag1'], product['tag2'], product['tag3']) if tag)
+        if group == 'day':
+            return (format_timestamp(order['order_date'], "%Y-%m-%d"),)
+        return (order['status'],)
+
+    def revenue_by(self, group, statuses=('completed',)):
+        # Returns {group key: revenue}; a line counts toward each of its product's tags
+        if group not in GROUPS:
+            raise ValueError("Unknown group: {}".format(group))
+
+        keys = []
+        amounts = []
+        for order, product, amount in self._order_lines(statuses):
+            for key in self._group_key(group, order, product):
+                keys.append(key)
+                amounts.append(amount)
+
+        if not keys:
+            return {}
+        if numpy is not None:
+            labels, inverse = numpy.unique(numpy.array(keys, dtype=object), return_inverse=True)
+            sums = numpy.bincount(inverse, weights=numpy.array(amounts, dtype=float))
+            return {label: float(total) for label, total in zip(labels.tolist(), sums)}
+
+        totals = {}
+        for key, amount in zip(keys, amounts):
+            totals[key] = totals.get(key, 0.0) + amount
+        return totals
@@ -0,0 +1,756 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import datagen
+from GUI import PAGE_SIZE, EcommercePlatform
+from logstorage import LogStorage
+from sharding import ShardedPlatform
+from storage import TABLES, SQLiteStorage
+from records import ProductRecord
+from regions import REGIONS, as_mask
+
+
+def build_platform(num_vendors, num_products, num_customers=100):
+    platform = EcommercePlatform()
+    for v in range(num_vendors):
+        platform.add_vendor("Vendor {}".format(v), "Global")
+    for p in range(num_products):
+        vendor_id = (p % num_vendors) + 1
+        platform.add_product(vendor_id, "Product {}".format(p), 1.0 + p % 100, "Tag{}".format(p % 50), None, None)
+    for c in range(num_customers):
+        platform.add_customer("Customer {}".format(c), "555-000-0000", "1 Test St")
+    return platform
+
+
+def time_lookups(platform, lookup, ids, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in ids:
+            lookup(i)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(ids)
+
+
+def bench_primary_key_lookups(sizes=(1000, 10000, 100000)):
+    print("Primary key lookups (seconds per call)")
+    print("{:>10} {:>14} {:>14} {:>14}".format("products", "get_product", "get_vendor", "get_customer"))
+    for size in sizes:
+        platform = build_platform(max(1, size // 100), size)
+        product_ids = list(range(1, len(platform.products) + 1, max(1, size // 1000)))
+        vendor_ids = [platform.products[i - 1]['vendor_id'] for i in product_ids]
+        customer_ids = [(i % len(platform.customers)) + 1 for i in product_ids]
+        print("{:>10} {:>14.2e} {:>14.2e} {:>14.2e}".format(
+            size,
+            time_lookups(platform, platform.get_product, product_ids),
+            time_lookups(platform, platform.get_vendor, vendor_ids),
+            time_lookups(platform, platform.get_customer, customer_ids)
+        ))
+
+
+def bench_search(sizes=(1000, 10000, 100000), queries=("product 42", "tag7", "oduct 99", "zzz")):
+    print("search_products (seconds per query, uncached / cached)")
+    print("{:>10} ".format("products") + " ".join("{:>20}".format(q) for q in queries))
+    for size in sizes:
+        platform = build_platform(max(1, size // 100), size)
+        
+        def uncached(query):
+            platform.search_cache.clear()
+            platform.search_products(query)
+        
+        timings = [(time_lookups(platform, uncached, [q], repeat=3),
+                    time_lookups(platform, platform.search_products, [q], repeat=3)) for q in queries]
+        print("{:>10} ".format(size) + " ".join("{:>9.2e} / {:>8.2e}".format(*t) for t in timings))
+
+
+def bench_refined_search(size=100000, typed="product 4217"):
+    # Typing a query one character at a time, as search-as-you-type sees it
+    platform = build_platform(max(1, size // 100), size)
+    prefixes = [typed[:i] for i in range(1, len(typed) + 1)]
+    start = time.perf_counter()
+    for prefix in prefixes:
+        platform.search_product_ids(prefix)
+    typed_time = time.perf_counter() - start
+    
+    platform.search_cache.clear()
+    start = time.perf_counter()
+    platform.search_product_ids(typed)
+    direct_time = time.perf_counter() - start
+    print("Typing {!r} at {} products: {:.2e}s for {} keystrokes, {:.2e}s for the final query alone".format(
+        typed, size, typed_time, len(prefixes), direct_time))
+
+
+def bench_search_index_memory(size=100000):
+    # Memory of the product text index alone, built over an existing catalog
+    platform = EcommercePlatform(sample_data=False)
+    fill_catalog(platform, max(1, size // 100), size)
+    index_only = EcommercePlatform(sample_data=False)
+    tracemalloc.start()
+    index_only._index_product_text(platform.products)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("Search index at {} products: {} grams, {:.0f} bytes/product".format(
+        size, len(index_only.search_index), used / size))
+
+
+def bytes_per_row(make_row, rows):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    table = [make_row(i) for i in range(rows)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del table
+    return (after - before) / rows
+
+
+def bench_record_memory(rows=1000000):
+    # Names and prices are created inside both builders so they count the same way
+    tags = ["Tag{}".format(t) for t in range(50)]
+    
+    def as_dict(i):
+        return {
+            'product_id': i + 1,
+            'vendor_id': i % 1000 + 1,
+            'name': "Product {}".format(i),
+            'price': 1.0 + i % 100,
+            'tag1': tags[i % 50],
+            'tag2': None,
+            'tag3': None
+        }
+    
+    def as_record(i):
+        return ProductRecord(
+            product_id=i + 1,
+            vendor_id=i % 1000 + 1,
+            name="Product {}".format(i),
+            price=1.0 + i % 100,
+            tag1=tags[i % 50],
+            tag2=None,
+            tag3=None
+        )
+    
+    dict_bytes = bytes_per_row(as_dict, rows)
+    record_bytes = bytes_per_row(as_record, rows)
+    print("Product rows at {}: dict {:.0f} bytes/row, ProductRecord {:.0f} bytes/row ({:.0%} of dict)".format(
+        rows, dict_bytes, record_bytes, record_bytes / dict_bytes))
+
+
+def stress_concurrent_orders(threads=16, orders_per_thread=50, items_per_order=5):
+    # Many threads add to, remove from and check out orders at once, against SQLite.
+    # Afterwards no order item may be lost or duplicated, in memory or on disk.
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "stress.db"))
+        platform = EcommercePlatform(storage)
+        product_ids = [product['product_id'] for product in platform.products]
+        kept = []
+        failures = []
+        
+        def shopper(worker):
+            try:
+                customer_id = platform.add_customer("Stress {}".format(worker), "555-000-0000", "1 Test St")
+                for n in range(orders_per_thread):
+                    order_id = platform.create_order(customer_id)
+                    item_ids = []
+                    for i in range(items_per_order):
+                        product = platform.get_product(product_ids[(worker + n + i) % len(product_ids)])
+                        item_ids.append(platform.add_to_order(order_id, product['product_id'], product['vendor_id']))
+                    platform.remove_from_order(item_ids.pop())
+                    platform.checkout_order(order_id)
+                    kept.extend(item_ids)
+            except Exception as error:
+                failures.append(error)
+        
+        workers = [threading.Thread(target=shopper, args=(w,)) for w in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        
+        expected = threads * orders_per_thread * (items_per_order - 1)
+        memory_ids = [item['order_item_id'] for item in platform.order_items]
+        disk_ids = [row[0] for row in storage.conn.execute("SELECT order_item_id FROM order_items")]
+        unfrozen = storage.conn.execute("SELECT COUNT(*) FROM order_items WHERE unit_price IS NULL").fetchone()[0]
+        problems = list(failures)
+        if len(kept) != expected or len(set(kept)) != expected:
+            problems.append("returned ids: {} ({} distinct), expected {}".format(len(kept), len(set(kept)), expected))
+        if sorted(memory_ids) != sorted(kept):
+            problems.append("in-memory order items do not match the ids handed out")
+        if sorted(disk_ids) != sorted(kept):
+            problems.append("stored order items do not match the ids handed out")
+        if unfrozen:
+            problems.append("{} checked out items have no frozen price".format(unfrozen))
+        storage.close()
+    
+    print("Concurrent orders: {} threads, {} items in {:.2f}s: {}".format(
+        threads, expected, elapsed, "OK" if not problems else "FAILED"))
+    for problem in problems[:10]:
+        print("  {}".format(problem))
+    return not problems
+
+
+def time_log_recovery(directory):
+    start = time.perf_counter()
+    storage = LogStorage(directory)
+    rows = sum(1 for table in TABLES for _ in storage.load(table))
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return rows, elapsed
+
+
+def bench_log_recovery(products=200000, chunk=10000):
+    # Cold start of the operation log storage: replaying the whole log versus
+    # loading a snapshot (via mmap) plus a short log tail
+    with tempfile.TemporaryDirectory() as directory:
+        storage = LogStorage(directory)
+        platform = EcommercePlatform(storage, sample_data=False)
+        platform.bulk_add('vendors', [{'business_name': "Vendor {}".format(v), 'feedback_score': 0.0,
+                                       'geographical_presence': "Global"} for v in range(100)])
+        for offset in range(0, products, chunk):
+            platform.bulk_add('products', [{'vendor_id': i % 100 + 1, 'name': "Product {}".format(i), 'price': 1.0,
+                                            'tag1': "Tag{}".format(i % 50)} for i in range(offset, offset + chunk)])
+        storage.close()
+        rows, log_only = time_log_recovery(directory)
+        
+        storage = LogStorage(directory)
+        platform = EcommercePlatform(storage, sample_data=False)
+        storage.snapshot()
+        customer_id = platform.add_customer("Tail", "555-000-0000", "1 Test St")
+        for _ in range(1000):
+            platform.create_order(customer_id)
+        storage.close()
+        tail_rows, with_snapshot = time_log_recovery(directory)
+    
+    print("Log recovery of {} rows: {:.2f}s replaying the log, {:.2f}s from snapshot + {} op tail".format(
+        rows, log_only, with_snapshot, tail_rows - rows))
+
+
+def fill_catalog(platform, vendors, products, chunk=10000):
+    platform.bulk_add('vendors', [{'business_name': "Vendor {}".format(v), 'feedback_score': 0.0,
+                                   'geographical_presence': "Global"} for v in range(vendors)])
+    for offset in range(0, products, chunk):
+        platform.bulk_add('products', [{'vendor_id': i % vendors + 1, 'name': "Product {}".format(i),
+                                        'price': 1.0 + i % 100, 'tag1': "Tag{}".format(i % 50)}
+                                       for i in range(offset, min(products, offset + chunk))])
+
+
+def search_throughput(platform, queries, clients=4):
+    # Runs the queries from several client threads at once; returns queries per second
+    per_client = [queries[c::clients] for c in range(clients)]
+    
+    def client(batch):
+        for query in batch:
+            platform.search_product_ids(query)
+    
+    threads = [threading.Thread(target=client, args=(batch,)) for batch in per_client]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(queries) / (time.perf_counter() - start)
+
+
+def bench_shard_scaling(products=100000, max_shards=None, query_count=300):
+    max_shards = max_shards or multiprocessing.cpu_count()
+    rng = random.Random(7)
+    queries = ["product {}".format(rng.randrange(products)) for _ in range(query_count)] + ["tag{}".format(t) for t in range(20)]
+    
+    platform = EcommercePlatform(sample_data=False)
+    fill_catalog(platform, 100, products)
+    print("Search throughput at {} products ({} CPUs)".format(products, multiprocessing.cpu_count()))
+    print("{:>12} {:>10}".format("unsharded", "{:.0f} q/s".format(search_throughput(platform, queries))))
+    
+    for shards in range(1, max_shards + 1):
+        platform = ShardedPlatform(sample_data=False, shards=shards)
+        try:
+            fill_catalog(platform, 100, products)
+            print("{:>12} {:>10}".format("{} shards".format(shards), "{:.0f} q/s".format(search_throughput(platform, queries))))
+        finally:
+            platform.close()
+
+
+def bench_order_history(sizes=(10000, 100000, 1000000), history=2000, page=50):
+    # One customer with `history` orders among `size` orders of other customers;
+    # loading the first and a deep page should not depend on `size`
+    print("get_customer_orders, {} orders of one customer (seconds per page of {})".format(history, page))
+    print("{:>10} {:>14} {:>14}".format("orders", "newest page", "cursor page"))
+    for size in sizes:
+        platform = EcommercePlatform(sample_data=False)
+        customer_ids, errors = platform.bulk_add('customers', [{'name': "Customer {}".format(c)} for c in range(1000)])
+        start = time.time() - size
+        platform.bulk_add('orders', [{'customer_id': customer_ids[i % 1000] if i % (size // history) else customer_ids[0],
+                                      'order_date': start + i, 'status': 'completed'} for i in range(size)])
+        cursor = platform.get_customer_orders(customer_ids[0], history // 2, 1)[0]['order_id']
+        print("{:>10} {:>14.2e} {:>14.2e}".format(
+            size,
+            time_lookups(platform, lambda c: platform.get_customer_orders(c, 0, page), [customer_ids[0]] * 100),
+            time_lookups(platform, lambda c: platform.get_customer_orders(c, 0, page, cursor), [customer_ids[0]] * 100)
+        ))
+
+
+def bench_faceted_search(size=100000, k=20):
+    # query_products against filtering and sorting every product by hand
+    platform = EcommercePlatform(sample_data=False)
+    fill_catalog(platform, 100, size)
+    queries = [
+        ("text + price", dict(search_term="product 1", min_price=10, max_price=20)),
+        ("price range", dict(min_price=40, max_price=41)),
+        ("tag + vendor", dict(tags=["Tag7"], vendor_ids=[8, 58])),
+        ("text, by price", dict(search_term="product 9", sort='price_asc')),
+    ]
+    
+    def naive(search_term='', min_price=None, max_price=None, vendor_ids=None, tags=None, sort='relevance'):
+        terms = search_term.lower().split()
+        matches = [p for p in platform.products
+                   if all(any(t in f for f in platform._product_search_fields(p)) for t in terms)
+                   and (min_price is None or p['price'] >= min_price) and (max_price is None or p['price'] <= max_price)
+                   and (vendor_ids is None or p['vendor_id'] in vendor_ids)
+                   and (tags is None or any(tag in (p['tag1'], p['tag2'], p['tag3']) for tag in tags))]
+        matches.sort(key=lambda p: p['price'] if sort == 'price_asc' else p['product_id'])
+        return matches[:k]
+    
+    print("Faceted search at {} products (seconds per query)".format(size))
+    print("{:>16} {:>10} {:>14} {:>14}".format("query", "matches", "query_products", "full scan"))
+    for name, kwargs in queries:
+        total = platform.query_products(limit=k, **kwargs)['total']
+        print("{:>16} {:>10} {:>14.2e} {:>14.2e}".format(
+            name, total,
+            time_lookups(platform, lambda _: platform.query_products(limit=k, **kwargs), [0], repeat=5),
+            time_lookups(platform, lambda _: naive(**kwargs), [0], repeat=2)
+        ))
+
+
+def bench_recommendations(orders=1000000, products=10000, items_per_order=4, queries=1000):
+    # Cost a checkout adds to keep co-purchase counts current, and also_bought latency
+    platform = EcommercePlatform(sample_data=False)
+    fill_catalog(platform, 100, products)
+    platform.bulk_add('customers', [{'name': "Customer {}".format(i)} for i in range(1000)])
+    rng = random.Random(0)
+    product_vendors = {product['product_id']: product['vendor_id'] for product in platform.products}
+    
+    def fill_orders(count):
+        # Pending orders of Zipf distributed products, ready for checkout
+        order_ids = []
+        for _ in range(count):
+            order_id = platform.create_order(rng.randint(1, 1000))
+            for _ in range(items_per_order):
+                product_id = datagen.zipf_index(rng, products) + 1
+                platform.add_to_order(order_id, product_id, product_vendors[product_id])
+            order_ids.append(order_id)
+        return order_ids
+    
+    def checkout_seconds(order_ids):
+        start = time.perf_counter()
+        for order_id in order_ids:
+            platform.checkout_order(order_id)
+        return (time.perf_counter() - start) / len(order_ids)
+    
+    print("Recommendations with {} products, {} items per order".format(products, items_per_order))
+    print("{:>10} {:>14} {:>14} {:>14}".format("orders", "checkout s", "also_bought s", "pairs"))
+    done = 0
+    for size in (orders // 100, orders // 10, orders):
+        checkout = checkout_seconds(fill_orders(size - done))
+        done = size
+        ids = [datagen.zipf_index(rng, products) + 1 for _ in range(queries)]
+        pairs = sum(len(neighbors) for neighbors in platform.recommendations.counts.values())
+        print("{:>10} {:>14.2e} {:>14.2e} {:>14}".format(
+            size, checkout, time_lookups(platform, platform.also_bought, ids), pairs))
+
+
+def bench_vendor_leaderboard(vendors=100000, ratings=1000000, queries=1000):
+    # rate_vendor cost and leaderboard reads against sorting every vendor by score per request
+    platform = EcommercePlatform(sample_data=False)
+    platform.bulk_add('vendors', [{'business_name': "Vendor {}".format(v), 'feedback_score': 0.0,
+                                   'geographical_presence': "Global"} for v in range(vendors)])
+    platform.bulk_add('products', [{'vendor_id': v + 1, 'name': "Product {}".format(v), 'price': 1.0} for v in range(vendors)])
+    customer_id = platform.add_customer("Rater", "555-000-0000", "1 Test St")
+    rng = random.Random(0)
+    vendor_ratings = platform.vendor_ratings
+    
+    def naive_top(n):
+        return sorted(platform.vendors, key=lambda v: (-vendor_ratings.score(v['vendor_id']), v['vendor_id']))[:n]
+    
+    print("Vendor leaderboard with {} vendors (seconds per call)".format(vendors))
+    print("{:>10} {:>14} {:>14} {:>14} {:>14}".format("ratings", "rate_vendor", "top_vendors", "vendor_rating", "full sort"))
+    done = 0
+    for size in (ratings // 100, ratings // 10, ratings):
+        # One completed single-vendor order per rating; only rating it is timed
+        orders = []
+        for _ in range(size - done):
+            vendor_id = datagen.zipf_index(rng, vendors) + 1
+            order_id = platform.create_order(customer_id)
+            platform.add_to_order(order_id, vendor_id, vendor_id)
+            platform.checkout_order(order_id)
+            orders.append((order_id, vendor_id, rng.randint(1, 5)))
+        start = time.perf_counter()
+        for order_id, vendor_id, rating in orders:
+            platform.rate_vendor(order_id, vendor_id, rating)
+        rate = (time.perf_counter() - start) / len(orders)
+        done = size
+        ids = [rng.randint(1, vendors) for _ in range(queries)]
+        print("{:>10} {:>14.2e} {:>14.2e} {:>14.2e} {:>14.2e}".format(
+            size, rate,
+            time_lookups(platform, lambda _: platform.top_vendors(0, 10), [0] * 100),
+            time_lookups(platform, platform.vendor_rating, ids),
+            time_lookups(platform, naive_top, [10], repeat=2)
+        ))
+
+
+def bench_cart_batch(lines=(10, 100, 1000), clicks_per_line=5, repeat=5):
+    # One add_to_order per click against one add_items_to_order call for the same clicks
+    platform = EcommercePlatform(sample_data=False)
+    fill_catalog(platform, 10, max(lines))
+    customer_id = platform.add_customer("Shopper", "555-000-0000", "1 Test St")
+    
+    def best_time(add):
+        best = None
+        for _ in range(repeat):
+            order_id = platform.create_order(customer_id)
+            start = time.perf_counter()
+            add(order_id)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(platform.get_order_items(order_id))
+    
+    print("Filling a cart with {} clicks per product (seconds per cart)".format(clicks_per_line))
+    print("{:>10} {:>14} {:>10} {:>14} {:>10}".format("products", "add_to_order", "lines", "batch", "lines"))
+    for size in lines:
+        clicks = [product_id for product_id in range(1, size + 1) for _ in range(clicks_per_line)]
+        vendors = {product_id: platform.get_product(product_id)['vendor_id'] for product_id in clicks}
+        
+        def one_by_one(order_id):
+            for product_id in clicks:
+                platform.add_to_order(order_id, product_id, vendors[product_id])
+        
+        print("{:>10} {:>14.2e} {:>10} {:>14.2e} {:>10}".format(
+            size, *(best_time(one_by_one) + best_time(
+                lambda order_id: platform.add_items_to_order(order_id, [(product_id, 1) for product_id in clicks])))))
+
+
+def bench_region_search(size=1000000, vendors=1000, queries=("product 42", "tag7", "product 1"), region="Europe"):
+    # Region-scoped search (bitwise vendor masks) against unfiltered search and
+    # against matching the vendors' presence text per product
+    platform = EcommercePlatform(sample_data=False)
+    rng = random.Random(0)
+    platform.bulk_add('vendors', [{'business_name': "Vendor {}".format(v), 'feedback_score': 0.0,
+                                   'geographical_presence': "Global" if v % 5 == 0 else ", ".join(rng.sample(REGIONS, 2))}
+                                  for v in range(vendors)])
+    for offset in range(0, size, 10000):
+        platform.bulk_add('products', [{'vendor_id': i % vendors + 1, 'name': "Product {}".format(i),
+                                        'price': 1.0 + i % 100, 'tag1': "Tag{}".format(i % 50)}
+                                       for i in range(offset, min(size, offset + 10000))])
+    mask = as_mask(region)
+    
+    def by_text(query):
+        wanted = region.lower()
+        return [p for p in platform.search_products(query)
+                if any(name.strip().lower() in (wanted, 'global')
+                       for name in platform.get_vendor(p['vendor_id'])['geographical_presence'].split(','))]
+    
+    print("Search in {} at {} products (seconds per query)".format(region, size))
+    print("{:>12} {:>10} {:>10} {:>14} {:>14} {:>14} {:>14}".format(
+        "query", "matches", "in region", "unfiltered", "region mask", "query_products", "text match"))
+    for query in queries:
+        print("{:>12} {:>10} {:>10} {:>14.2e} {:>14.2e} {:>14.2e} {:>14.2e}".format(
+            query, len(platform.search_product_ids(query)), len(platform.search_products(query, region=mask)),
+            time_lookups(platform, platform.search_products, [query], repeat=3),
+            time_lookups(platform, lambda q: platform.search_products(q, region=mask), [query], repeat=3),
+            time_lookups(platform, lambda q: platform.query_products(q, regions=mask, facets=False), [query], repeat=3),
+            time_lookups(platform, by_text, [query], repeat=3)
+        ))
+    print("{:>12} {:>10} {:>10} {:>14} {:>14} {:>14.2e}".format(
+        "(browse)", size, platform.query_products(regions=mask, facets=False)['total'], "", "",
+        time_lookups(platform, lambda _: platform.query_products(regions=mask, facets=False), [0], repeat=3)))
+
+
+# Suite: every public method on generated data, written as JSON
+
+# Every round loads the data afresh, opens it from SQLite and times each method
+# for at least SUITE_MIN_SECONDS (and at least SUITE_MIN_CALLS calls). A method's
+# time is its best round's median and load/startup time the best round's, so a
+# slow spell of the machine spoils one round rather than every sample of one
+# measurement.
+SUITE_REPEATS = 5
+SUITE_MIN_SECONDS = 0.05
+SUITE_MIN_CALLS = 3
+SUITE_MAX_CALLS = 200
+
+# Memory per row is measured on at most this many generated rows
+MEMORY_SAMPLE_ROWS = 200000
+
+# Slowdown (relative) that `compare` reports as a regression. A method must
+# also slow down by more than the spread of both runs' rounds and by more than
+# REGRESSION_FLOOR_S, so timer noise on sub-microsecond calls is not flagged.
+REGRESSION_THRESHOLD = 0.25
+REGRESSION_FLOOR_S = 1e-6
+
+
+def time_call(setup, call):
+    # One round: setup() returns the arguments of one call; only call(*args) is timed
+    samples = []
+    while len(samples) < SUITE_MAX_CALLS and (len(samples) < SUITE_MIN_CALLS or sum(samples) < SUITE_MIN_SECONDS):
+        args = setup()
+        start = time.perf_counter()
+        call(*args)
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)
+
+
+def best_of(values):
+    # (best, spread): the spread is how far the next best is, i.e. how well the
+    # best of the rounds reproduces, and is not widened by one slow round
+    values = sorted(values)
+    return values[0], (values[1] - values[0] if len(values) > 1 else 0.0)
+
+
+def call_timing(rounds):
+    best, spread = best_of(samples[len(samples) // 2] for samples in rounds)
+    samples = sorted(itertools.chain.from_iterable(rounds))
+    return {
+        'calls': len(samples),
+        'median_s': best,
+        'spread_s': spread,
+        'p95_s': samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+    }
+
+
+def suite_calls(platform, rng):
+    # {method name: (setup, call)} for every public EcommercePlatform method
+    vendor = lambda: rng.randint(1, platform.count_vendors())
+    product = lambda: rng.randint(1, len(platform.products))
+    customer = lambda: rng.randint(1, len(platform.customers))
+    order = lambda: rng.randint(1, len(platform.orders))
+    term = lambda: platform.get_product(product())['name'].split()[0][:rng.randint(3, 6)].lower()
+    
+    def pending_order(items=1):
+        order_id = platform.create_order(customer())
+        for _ in range(items):
+            product_id = product()
+            platform.add_to_order(order_id, product_id, platform.get_product(product_id)['vendor_id'])
+        return order_id
+    
+    def rateable_order():
+        order_id = pending_order(1)
+        platform.checkout_order(order_id)
+        return order_id, platform.rateable_vendors(order_id)[0], rng.randint(1, 5)
+    
+    def new_item():
+        product_id = product()
+        return platform.add_to_order(pending_order(0), product_id, platform.get_product(product_id)['vendor_id'])
+    
+    none = lambda: ()
+    return {
+        'list_all_vendors': (lambda: (rng.randrange(platform.count_vendors()), PAGE_SIZE), platform.list_all_vendors),
+        'count_vendors': (none, platform.count_vendors),
+        'add_vendor': (lambda: ("Bench Vendor", "Europe, Asia"), platform.add_vendor),
+        'get_vendor': (lambda: (vendor(),), platform.get_vendor),
+        'list_vendor_products': (lambda: (vendor(), 0, PAGE_SIZE), platform.list_vendor_products),
+        'count_vendor_products': (lambda: (vendor(),), platform.count_vendor_products),
+        'customer_region': (lambda: (customer(),), platform.customer_region),
+        'add_product': (lambda: (vendor(), "Bench Product", 9.99, "Bench"), platform.add_product),
+        'get_product': (lambda: (product(),), platform.get_product),
+        'search_products': (lambda: (term(), 0, PAGE_SIZE), platform.search_products),
+        'search_product_ids': (lambda: (term(),), platform.search_product_ids),
+        'query_products': (lambda: (term(), 10.0, 100.0), platform.query_products),
+        'product_results': (lambda: ([product() for _ in range(50)],), platform.product_results),
+        'add_customer': (lambda: ("Bench Customer", "555-000-0000", "1 Bench St, Europe"), platform.add_customer),
+        'get_customer': (lambda: (customer(),), platform.get_customer),
+        'create_order': (lambda: (customer(),), platform.create_order),
+        'get_order': (lambda: (order(),), platform.get_order),
+        'add_to_order': (lambda: (pending_order(0), 1, platform.get_product(1)['vendor_id']), platform.add_to_order),
+        'add_items_to_order': (lambda: (pending_order(0), [(product(), 1) for _ in range(10)]), platform.add_items_to_order),
+        'set_order_quantities': (lambda: (pending_order(5), [(product(), 2) for _ in range(5)]), platform.set_order_quantities),
+        'get_order_items': (lambda: (order(),), platform.get_order_items),
+        'remove_from_order': (lambda: (new_item(),), platform.remove_from_order),
+        'checkout_order': (lambda: (pending_order(3),), platform.checkout_order),
+        'cancel_order': (lambda: (pending_order(1),), platform.cancel_order),
+        'get_customer_orders': (lambda: (customer(), 0, 50), platform.get_customer_orders),
+        'count_customer_orders': (lambda: (customer(),), platform.count_customer_orders),
+        'bulk_add': (lambda: ('customers', [{'name': "Bulk {}".format(i)} for i in range(100)]), platform.bulk_add),
+        'get_rows': (lambda: ('products', rng.randrange(len(platform.products)), PAGE_SIZE), platform.get_rows),
+        'get_order_total': (lambda: (order(),), platform.get_order_total),
+        'get_sales_summary': (none, platform.get_sales_summary),
+        'also_bought': (lambda: (product(),), platform.also_bought),
+        'rate_vendor': (rateable_order, platform.rate_vendor),
+        'rateable_vendors': (lambda: (order(),), platform.rateable_vendors),
+        'top_vendors': (lambda: (rng.randrange(platform.count_vendors()), PAGE_SIZE), platform.top_vendors),
+        'vendor_rating': (lambda: (vendor(),), platform.vendor_rating),
+        'get_revenue_by': (lambda: (rng.choice(('vendor', 'tag', 'day', 'status')),), platform.get_revenue_by),
+    }
+
+
+def public_methods():
+    return sorted(name for name in dir(EcommercePlatform)
+                  if not name.startswith('_') and callable(getattr(EcommercePlatform, name))
+                  and name not in ('load_from_storage', 'add_sample_data'))
+
+
+def startup_database(rows, seed):
+    # Path of a new SQLite database, in a temporary directory, holding the generated data
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    storage = SQLiteStorage(path)
+    for table, chunk in datagen.generate(rows, seed):
+        storage.insert_many(table, chunk)
+    storage.close()
+    return path
+
+
+def measure_startup(path):
+    # Seconds to open a platform on the database
+    storage = SQLiteStorage(path)
+    start = time.perf_counter()
+    EcommercePlatform(storage, sample_data=False)
+    elapsed = time.perf_counter() - start
+    storage.close()
+    return elapsed
+
+
+def remove_database(path):
+    directory = os.path.dirname(path)
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+def measure_memory(rows, seed):
+    rows = min(rows, MEMORY_SAMPLE_ROWS)
+    tracemalloc.start()
+    platform = EcommercePlatform(sample_data=False)
+    counts = datagen.populate(platform, rows, seed)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used / sum(counts.values())
+
+
+def run_suite(rows, seed=0, memory=True, startup=True):
+    results = {'rows': rows, 'seed': seed, 'python': sys.version.split()[0], 'cpus': multiprocessing.cpu_count()}
+    
+    path = startup_database(rows, seed) if startup else None
+    rng = random.Random(seed)
+    times = {'load_s': [], 'startup_s': []}
+    rounds = {}
+    for _ in range(SUITE_REPEATS):
+        platform = EcommercePlatform(sample_data=False)
+        start = time.perf_counter()
+        results['tables'] = datagen.populate(platform, rows, seed)
+        times['load_s'].append(time.perf_counter() - start)
+        if path:
+            times['startup_s'].append(measure_startup(path))
+        
+        calls = suite_calls(platform, rng)
+        for name, (setup, call) in calls.items():
+            rounds.setdefault(name, []).append(time_call(setup, call))
+    if path:
+        remove_database(path)
+    results['untimed_methods'] = [name for name in public_methods() if name not in rounds]
+    results['methods'] = {name: call_timing(samples) for name, samples in rounds.items()}
+    
+    # Spreads of the measurements taken once per round, for compare
+    results['spreads'] = {}
+    for key, samples in times.items():
+        if samples:
+            results[key], results['spreads'][key] = best_of(samples)
+    if memory:
+        results['memory_bytes_per_row'] = measure_memory(rows, seed)
+    return results
+
+
+def comparable(results):
+    # Flat {measurement: (value, spread)} where larger is worse; measurements
+    # taken once (memory, or results from older runs) have no spread
+    values = {'method.' + name: (timing['median_s'], timing.get('spread_s', 0.0))
+              for name, timing in results['methods'].items()}
+    for key in ('load_s', 'startup_s', 'memory_bytes_per_row'):
+        if key in results:
+            values[key] = (results[key], results.get('spreads', {}).get(key, 0.0))
+    return values
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    # Prints old and new side by side; returns the measurements that got worse by
+    # more than threshold and, for methods, by more than the noise of either run
+    if (old['rows'], old['seed']) != (new['rows'], new['seed']):
+        print("warning: runs used different data ({} rows seed {} vs {} rows seed {})".format(
+            old['rows'], old['seed'], new['rows'], new['seed']))
+    old_values = comparable(old)
+    new_values = comparable(new)
+    regressions = []
+    print("{:<34} {:>12} {:>12} {:>8}".format("measurement", "old", "new", "change"))
+    for key in sorted(set(old_values) & set(new_values)):
+        (before, old_spread), (after, new_spread) = old_values[key], new_values[key]
+        change = (after - before) / before if before else 0.0
+        noise = old_spread + new_spread
+        if key.startswith('method.'):
+            noise = max(noise, REGRESSION_FLOOR_S)
+        flag = ""
+        if change > threshold and after - before > noise:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print("{:<34} {:>12.4g} {:>12.4g} {:>+7.0%}{}".format(key, before, after, change, flag))
+    return regressions
+
+
+def run_all():
+    bench_primary_key_lookups()
+    bench_search()
+    bench_refined_search()
+    bench_search_index_memory()
+    bench_record_memory()
+    stress_concurrent_orders()
+    bench_log_recovery()
+    bench_shard_scaling()
+    bench_order_history()
+    bench_faceted_search()
+    bench_recommendations()
+    bench_vendor_leaderboard()
+    bench_cart_batch()
+    bench_region_search()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Platform benchmarks. Without a command the individual benchmarks are run.")
+    commands = parser.add_subparsers(dest='command')
+    suite = commands.add_parser('suite', help="time every public method on generated data and write JSON")
+    suite.add_argument('--rows', type=int, default=100000, help="approximate generated rows (default: %(default)s)")
+    suite.add_argument('--seed', type=int, default=0)
+    suite.add_argument('--output', help="JSON file for the results (default: print them)")
+    suite.add_argument('--no-memory', action='store_true', help="skip the memory per row measurement")
+    suite.add_argument('--no-startup', action='store_true', help="skip the SQLite startup measurement")
+    diff = commands.add_parser('compare', help="compare two suite results and flag regressions")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command == 'suite':
+        results = run_suite(args.rows, args.seed, not args.no_memory, not args.no_startup)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        else:
+            print(json.dumps(results, indent=2))
+        return 0
+    if args.command == 'compare':
+        with open(args.old, encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        return 1 if compare(old, new, args.threshold) else 0
+    run_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import argparse
+import csv
+import itertools
+import json
+import sys
+
+from GUI import DATABASE_PATH, EcommercePlatform
+from records import parse_timestamp
+from storage import TABLES, SQLiteStorage
+
+# Rows validated and added to the platform per batch
+BULK_CHUNK_SIZE = 5000
+
+# Rejected rows reported back in detail; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+INT_COLUMNS = {'vendor_id', 'product_id', 'customer_id', 'order_id', 'order_item_id', 'quantity', 'rating_id', 'rating'}
+FLOAT_COLUMNS = {'price', 'feedback_score', 'unit_price'}
+TIMESTAMP_COLUMNS = {'order_date', 'rated_at'}
+
+
+def file_format(path):
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith('.jsonl') or path.endswith('.ndjson'):
+        return 'jsonl'
+    raise ValueError("Unsupported file type (use .csv or .jsonl): {}".format(path))
+
+
+def read_rows(path):
+    # Yields (line number, raw row) one row at a time: a dict for CSV, the
+    # unparsed line for JSONL, so a bad line is rejected by convert_row alone
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format(path) == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_number, line
+
+
+def convert_row(table, raw):
+    # Converts a raw CSV/JSON row to the column types of the table
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    if not isinstance(raw, dict):
+        raise ValueError("Expected a JSON object, got {}".format(type(raw).__name__))
+    row = {}
+    for column in TABLES[table]:
+        value = raw.get(column)
+        if value == "":
+            value = None
+        if value is not None:
+            if column in INT_COLUMNS:
+                value = int(value)
+            elif column in FLOAT_COLUMNS:
+                value = float(value)
+            elif column in TIMESTAMP_COLUMNS:
+                value = parse_timestamp(value)
+            else:
+                value = str(value)
+        row[column] = value
+    if row.get('feedback_score') is None and table == 'vendors':
+        row['feedback_score'] = 0.0
+    if row.get('quantity') is None and table == 'order_items':
+        row['quantity'] = 1
+    return row
+
+
+def import_file(platform, table, path, chunk_size=BULK_CHUNK_SIZE, progress=None):
+    summary = {'imported': 0, 'rejected': 0, 'errors': []}
+
+    def reject(line_number, message):
+        summary['rejected'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append((line_number, message))
+
+    rows = read_rows(path)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        converted = []
+        line_numbers = []
+        for line_number, raw in chunk:
+            try:
+                converted.append(convert_row(table, raw))
+                line_numbers.append(line_number)
+            except (ValueError, TypeError) as error:
+                reject(line_number, str(error))
+
+        ids, errors = platform.bulk_add(table, converted)
+        summary['imported'] += len(ids)
+        for index, message in errors:
+            reject(line_numbers[index], message)
+
+        if progress:
+            progress(table, summary['imported'] + summary['rejected'])
+    summary['errors'].sort()
+    return summary
+
+
+def export_file(platform, table, path, chunk_size=BULK_CHUNK_SIZE, progress=None):
+    columns = TABLES[table]
+    fmt = file_format(path)
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns) if fmt == 'csv' else None
+        if writer:
+            writer.writeheader()
+        while True:
+            rows = platform.get_rows(table, written, chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                if writer:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(row) + "\n")
+            written += len(rows)
+            if progress:
+                progress(table, written)
+    return written
+
+
+def print_progress(table, rows):
+    sys.stderr.write("\r{}: {} rows".format(table, rows))
+    sys.stderr.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import or export platform data as CSV or JSON Lines")
+    parser.add_argument('action', choices=('import', 'export'))
+    parser.add_argument('table', choices=tuple(TABLES))
+    parser.add_argument('path', help="a .csv or .jsonl file")
+    parser.add_argument('--db', default=DATABASE_PATH, help="SQLite database (default: %(default)s)")
+    parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    storage = SQLiteStorage(args.db)
+    try:
+        platform = EcommercePlatform(storage, sample_data=False)
+        if args.action == 'import':
+            summary = import_file(platform, args.table, args.path, args.chunk_size, print_progress)
+            sys.stderr.write("\n")
+            print("Imported {} rows, rejected {}".format(summary['imported'], summary['rejected']))
+            for line_number, message in summary['errors']:
+                print("  line {}: {}".format(line_number, message))
+            return 1 if summary['rejected'] else 0
+        written = export_file(platform, args.table, args.path, args.chunk_size, print_progress)
+        sys.stderr.write("\n")
+        print("Exported {} rows".format(written))
+        return 0
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import argparse
+import array
+import datetime
+import json
+import math
+import os
+import random
+import sys
+
+from bulk import BULK_CHUNK_SIZE
+from regions import REGIONS
+
+# Share of the requested row count that goes to each table; vendors are one per
+# VENDOR_PRODUCTS products and order items make up the rest (about 2.7 per order)
+PRODUCT_SHARE = 0.35
+CUSTOMER_SHARE = 0.10
+ORDER_SHARE = 0.15
+VENDOR_PRODUCTS = 100
+
+# Distinct words product names and tags are drawn from (Zipf distributed)
+NAME_WORDS = 5000
+TAG_WORDS = 500
+
+# Most items in one order
+MAX_ORDER_ITEMS = 12
+
+ORDER_STATUSES = (('completed', 0.75), ('cancelled', 0.10), ('pending', 0.15))
+
+# Chance that a customer rates a vendor of a completed order, and how vendors'
+# typical ratings are spread (1 to 5 stars)
+RATING_SHARE = 0.3
+RATING_SPREAD = 1.0
+
+# Generated orders are spread over the year before this date
+END_DATE = datetime.datetime(2025, 1, 1)
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "ba", "do", "fu", "gi", "ha", "pe", "qu", "ro", "xa")
+
+
+def zipf_index(rng, n):
+    # Index in [0, n) with P(i) roughly proportional to 1 / (i + 1)
+    return min(n - 1, int(math.exp(rng.random() * math.log(n + 1))) - 1)
+
+
+def make_words(rng, count):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return [word.capitalize() for word in words]
+
+
+def table_sizes(rows):
+    products = max(10, int(rows * PRODUCT_SHARE))
+    return {
+        'vendors': max(3, products // VENDOR_PRODUCTS),
+        'products': products,
+        'customers': max(1, int(rows * CUSTOMER_SHARE)),
+        'orders': max(1, int(rows * ORDER_SHARE)),
+    }
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def generate(rows, seed=0, chunk_size=BULK_CHUNK_SIZE):
+    # Yields (table, list of rows) in load order, about `rows` rows in total. Every
+    # row has an explicit id, and the same rows and seed always give the same data.
+    rng = random.Random(seed)
+    sizes = table_sizes(rows)
+    name_words = make_words(rng, NAME_WORDS)
+    tag_words = make_words(rng, TAG_WORDS)
+
+    # Typical rating of each vendor, for the ratings of its orders
+    vendor_quality = array.array('d')
+
+    def vendors():
+        for vendor_id in range(1, sizes['vendors'] + 1):
+            presence = "Global" if rng.random() < 0.2 else ", ".join(rng.sample(REGIONS, rng.randint(1, 3)))
+            vendor_quality.append(rng.uniform(2.0, 5.0))
+            yield {'vendor_id': vendor_id, 'business_name': "{} {}".format(rng.choice(name_words), rng.choice(("Ltd", "Co", "Shop", "Goods"))),
+                   'feedback_score': 0.0, 'geographical_presence': presence}
+
+    # Price and vendor of each product, needed again for the order items (whose
+    # product and vendor names the platform fills in when adding them)
+    prices = array.array('d')
+    product_vendors = array.array('l')
+
+    def products():
+        for product_id in range(1, sizes['products'] + 1):
+            vendor_id = rng.randint(1, sizes['vendors'])
+            price = round(math.exp(rng.uniform(math.log(2), math.log(2000))), 2)
+            prices.append(price)
+            product_vendors.append(vendor_id)
+            tags = [tag_words[zipf_index(rng, TAG_WORDS)] for _ in range(rng.randint(0, 3))]
+            tags += [None] * (3 - len(tags))
+            yield {'product_id': product_id, 'vendor_id': vendor_id,
+                   'name': " ".join(name_words[zipf_index(rng, NAME_WORDS)] for _ in range(rng.randint(1, 3))),
+                   'price': price, 'tag1': tags[0], 'tag2': tags[1], 'tag3': tags[2]}
+
+    def customers():
+        for customer_id in range(1, sizes['customers'] + 1):
+            yield {'customer_id': customer_id, 'name': "{} {}".format(rng.choice(name_words), rng.choice(name_words)),
+                   'contact_number': "555-{:03d}-{:04d}".format(rng.randrange(1000), rng.randrange(10000)),
+                   'shipping_address': "{} {} St, {}".format(rng.randint(1, 9999), rng.choice(name_words), rng.choice(REGIONS))}
+
+    statuses = [status for status, share in ORDER_STATUSES]
+    status_weights = [share for status, share in ORDER_STATUSES]
+
+    # Date of each completed order (0.0 for the others), to rate its vendors after it
+    completed_dates = array.array('d')
+
+    def orders():
+        end = END_DATE.timestamp()
+        step = 365 * 86400.0 / sizes['orders']
+        for order_id in range(1, sizes['orders'] + 1):
+            order_date = end - (sizes['orders'] - order_id + rng.random()) * step
+            status = rng.choices(statuses, status_weights)[0]
+            completed_dates.append(order_date if status == 'completed' else 0.0)
+            yield {'order_id': order_id, 'customer_id': zipf_index(rng, sizes['customers']) + 1,
+                   'order_date': order_date, 'status': status}
+
+    # (order_id, vendor_id, rating, rated_at) of the ratings, drawn with the order items
+    ratings = []
+
+    def order_items():
+        order_item_id = 0
+        for order_id in range(1, sizes['orders'] + 1):
+            vendor_ids = set()
+            for _ in range(min(MAX_ORDER_ITEMS, 1 + int(rng.expovariate(0.6)))):
+                product = zipf_index(rng, sizes['products'])
+                vendor_ids.add(product_vendors[product])
+                order_item_id += 1
+                yield {'order_item_id': order_item_id, 'order_id': order_id, 'product_id': product + 1,
+                       'vendor_id': product_vendors[product], 'quantity': 1 + int(rng.expovariate(1.5)),
+                       'unit_price': prices[product], 'product_name': None, 'vendor_name': None}
+            if completed_dates[order_id - 1]:
+                for vendor_id in sorted(vendor_ids):
+                    if rng.random() < RATING_SHARE:
+                        rating = min(5, max(1, round(rng.gauss(vendor_quality[vendor_id - 1], RATING_SPREAD))))
+                        ratings.append((order_id, vendor_id, rating, completed_dates[order_id - 1] + rng.uniform(1, 14) * 86400))
+
+    def rating_rows():
+        for rating_id, (order_id, vendor_id, rating, rated_at) in enumerate(ratings, 1):
+            yield {'rating_id': rating_id, 'order_id': order_id, 'vendor_id': vendor_id, 'rating': rating, 'rated_at': rated_at}
+
+    for table, rows_of_table in (('vendors', vendors), ('products', products), ('customers', customers),
+                                 ('orders', orders), ('order_items', order_items), ('ratings', rating_rows)):
+        for chunk in _chunks(rows_of_table(), chunk_size):
+            yield table, chunk
+
+
+def populate(platform, rows, seed=0, chunk_size=BULK_CHUNK_SIZE):
+    # Adds generated data to a platform; returns {table: rows added}
+    counts = {}
+    for table, chunk in generate(rows, seed, chunk_size):
+        ids, errors = platform.bulk_add(table, chunk)
+        if errors:
+            raise ValueError("Generated {} row rejected: {}".format(table, errors[0]))
+        counts[table] = counts.get(table, 0) + len(ids)
+    return counts
+
+
+def write_files(directory, rows, seed=0):
+    # Writes one JSON Lines file per table, ready for `bulk.py import`
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    files = {}
+    try:
+        for table, chunk in generate(rows, seed):
+            if table not in files:
+                files[table] = open(os.path.join(directory, table + ".jsonl"), 'w', encoding='utf-8')
+            files[table].writelines(json.dumps(row) + "\n" for row in chunk)
+            counts[table] = counts.get(table, 0) + len(chunk)
+    finally:
+        for f in files.values():
+            f.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a reproducible synthetic data set as JSON Lines files")
+    parser.add_argument('directory')
+    parser.add_argument('--rows', type=int, default=100000, help="approximate total rows (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    counts = write_files(args.directory, args.rows, args.seed)
+    for table, count in counts.items():
+        print("{}: {} rows".format(table, count))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import collections
+import threading
+
+from storage import TABLES
+
+# Kinds of change
+INSERT = 'insert'
+UPDATE = 'update'
+DELETE = 'delete'
+
+# One changed row: key is the row's primary key, record the row itself (as it
+# was when deleted, for DELETE)
+Change = collections.namedtuple('Change', ('table', 'kind', 'key', 'record'))
+
+
+class ChangeBus:
+    # Delivers the row changes of an EcommercePlatform to subscribers as lists of
+    # Change. Callbacks run on the thread making the change while it holds the
+    # platform's write lock, so they should only queue the changes and return.
+    def __init__(self):
+        self.subscribers = ()
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers = self.subscribers + (callback,)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not callback)
+
+    def emit(self, table, kind, records):
+        subscribers = self.subscribers
+        if not subscribers or not records:
+            return
+        key = TABLES[table][0]
+        changes = [Change(table, kind, record[key], record) for record in records]
+        for callback in subscribers:
+            callback(changes)
@@ -0,0 +1,152 @@
+import bisect
+import heapq
+
+from regions import ALL_REGIONS, as_mask
+
+# Orders accepted by ProductFacets.top; 'vendor_score' puts the best rated
+# vendors' products first, by relevance within a vendor score
+SORTS = ('relevance', 'price_asc', 'price_desc', 'vendor_score')
+
+
+def product_tags(product):
+    return [tag for tag in (product['tag1'], product['tag2'], product['tag3']) if tag]
+
+
+def relevance(product, terms):
+    # Name matches outrank tag matches; a match at the start of the name or of a
+    # word in it outranks one in the middle of a word
+    name = product['name'].lower()
+    tags = [tag.lower() for tag in product_tags(product)]
+    score = 0
+    for term in terms:
+        position = name.find(term)
+        if position == 0:
+            score += 6
+        elif position > 0:
+            score += 5 if name[position - 1] == ' ' else 3
+        elif term in tags:
+            score += 2
+        elif any(term in tag for tag in tags):
+            score += 1
+    return score
+
+
+class ProductFacets:
+    # Filter indexes over the catalog of an EcommercePlatform: products sorted by
+    # price, and posting sets per tag and per vendor; region filters use the
+    # platform's RegionIndex. The platform reports new products; products are
+    # never changed or removed, so the indexes only grow.
+    def __init__(self, platform):
+        self.platform = platform
+        self.prices = []
+        self.tag_products = {}
+        self.vendor_products = {}
+
+    # Index maintenance
+    def products_added(self, products):
+        new_prices = sorted((product['price'], product['product_id']) for product in products)
+        if len(new_prices) > 16:
+            self.prices = list(heapq.merge(self.prices, new_prices))
+        else:
+            for entry in new_prices:
+                bisect.insort(self.prices, entry)
+
+        for product in products:
+            product_id = product['product_id']
+            self.vendor_products.setdefault(product['vendor_id'], set()).add(product_id)
+            for tag in product_tags(product):
+                self.tag_products.setdefault(tag.lower(), set()).add(product_id)
+
+    # Queries
+    def _price_range(self, min_price, max_price):
+        start = 0 if min_price is None else bisect.bisect_left(self.prices, (min_price,))
+        end = len(self.prices) if max_price is None else bisect.bisect_right(self.prices, (max_price, float('inf')))
+        return start, max(start, end)
+
+    def select(self, text_matches=None, min_price=None, max_price=None, vendor_ids=None, tags=None, regions=None):
+        # Ids of the products passing every given filter. text_matches is a set of
+        # ids; tags, vendors and regions match if the product has any of those given
+        # (regions as names or a region mask). The smallest filter provides the
+        # candidates and the others are checked on them.
+        index = self.platform.product_index
+        region_index = self.platform.regions
+        vendors = None if vendor_ids is None else set(vendor_ids)
+        mask = as_mask(regions)
+        if mask == ALL_REGIONS:
+            mask = None
+        tag_sets = None if tags is None else [self.tag_products.get(tag.lower(), set()) for tag in tags]
+        start, end = self._price_range(min_price, max_price)
+        price_filtered = min_price is not None or max_price is not None
+
+        sources = []
+        if text_matches is not None:
+            sources.append((len(text_matches), 'text'))
+        if vendors is not None:
+            sources.append((sum(len(self.vendor_products.get(v, ())) for v in vendors), 'vendor'))
+        if tag_sets is not None:
+            sources.append((sum(len(posting) for posting in tag_sets), 'tag'))
+        if price_filtered:
+            sources.append((end - start, 'price'))
+        if mask is not None:
+            sources.append((region_index.product_count(mask), 'region'))
+        if not sources:
+            return set(index)
+
+        source = min(sources)[1]
+        if source == 'text':
+            candidates = set(text_matches)
+        elif source == 'vendor':
+            candidates = set().union(*(self.vendor_products.get(v, ()) for v in vendors))
+        elif source == 'tag':
+            candidates = set().union(*tag_sets)
+        elif source == 'region':
+            candidates = region_index.products(mask)
+        else:
+            candidates = {product_id for price, product_id in self.prices[start:end]}
+
+        if self.platform.instruments:
+            self.platform.instruments.scanned(len(candidates))
+        if text_matches is not None and source != 'text':
+            candidates &= text_matches
+        if tag_sets is not None and source != 'tag':
+            candidates = {pid for pid in candidates if any(pid in posting for posting in tag_sets)}
+        if vendors is not None and source != 'vendor':
+            candidates = {pid for pid in candidates if index[pid]['vendor_id'] in vendors}
+        if mask is not None and source != 'region':
+            vendor_masks = region_index.vendor_masks
+            candidates = {pid for pid in candidates if vendor_masks.get(index[pid]['vendor_id'], 0) & mask}
+        if price_filtered and source != 'price':
+            low = float('-inf') if min_price is None else min_price
+            high = float('inf') if max_price is None else max_price
+            candidates = {pid for pid in candidates if low <= index[pid]['price'] <= high}
+        return candidates
+
+    def counts(self, product_ids):
+        # Facet counts of a result set: {'tag': {tag: n}, 'vendor': {vendor_id: n}}
+        index = self.platform.product_index
+        tag_counts = {}
+        vendor_counts = {}
+        for product_id in product_ids:
+            product = index[product_id]
+            vendor_counts[product['vendor_id']] = vendor_counts.get(product['vendor_id'], 0) + 1
+            for tag in product_tags(product):
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        return {'tag': tag_counts, 'vendor': vendor_counts}
+
+    def sort_key(self, terms=(), sort='relevance'):
+        # Key of a product id under one of SORTS; smaller is better
+        if sort not in SORTS:
+            raise ValueError("Unknown sort: {}".format(sort))
+        index = self.platform.product_index
+        if sort == 'price_asc':
+            return lambda pid: (index[pid]['price'], pid)
+        if sort == 'price_desc':
+            return lambda pid: (-index[pid]['price'], pid)
+        if sort == 'vendor_score':
+            score = self.platform.vendor_ratings.score
+            return lambda pid: (-score(index[pid]['vendor_id']), -relevance(index[pid], terms), pid)
+        return lambda pid: (-relevance(index[pid], terms), pid)
+
+    def top(self, product_ids, k, terms=(), sort='relevance'):
+        # The k best ids in order, without sorting the whole result set
+        return heapq.nsmallest(k, product_ids, key=self.sort_key(terms, sort))
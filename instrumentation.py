@@ -0,0 +1,150 @@
+import collections
+import cProfile
+import functools
+import io
+import json
+import pstats
+import threading
+import time
+
+# Latest call durations kept per name for percentiles
+MAX_SAMPLES = 10000
+
+# Methods left unwrapped: they run once at startup
+SKIPPED_METHODS = {'load_from_storage', 'add_sample_data'}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _row_count(result):
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, dict) and 'product_ids' in result:
+        return len(result['product_ids'])
+    return None
+
+
+class CallStats:
+    __slots__ = ('calls', 'seconds', 'samples', 'scanned', 'returned')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.samples = collections.deque(maxlen=MAX_SAMPLES)
+        self.scanned = 0
+        self.returned = 0
+
+    def report(self):
+        samples = sorted(self.samples)
+        return {
+            'calls': self.calls,
+            'total_ms': self.seconds * 1000,
+            'p50_ms': percentile(samples, 0.50) * 1000,
+            'p95_ms': percentile(samples, 0.95) * 1000,
+            'p99_ms': percentile(samples, 0.99) * 1000,
+            'rows_scanned': self.scanned,
+            'rows_returned': self.returned,
+        }
+
+
+class Instrumentation:
+    # Opt-in timing of platform methods and GUI refreshes. attach() wraps the public
+    # methods of one EcommercePlatform instance and detach() removes the wrappers,
+    # so nothing is measured, and nothing costs, while detached. Platform code
+    # reports rows it examined with `if self.instruments: self.instruments.scanned(n)`.
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.platform = None
+        self.profiler = None
+
+    @property
+    def enabled(self):
+        return self.platform is not None
+
+    def attach(self, platform):
+        self.detach()
+        for name in dir(type(platform)):
+            method = getattr(platform, name)
+            if name.startswith('_') or name in SKIPPED_METHODS or not callable(method):
+                continue
+            setattr(platform, name, self._wrap(name, method))
+        platform.instruments = self
+        self.platform = platform
+
+    def detach(self):
+        platform = self.platform
+        if platform is None:
+            return
+        for name in list(vars(platform)):
+            if getattr(getattr(platform, name), '__wrapped__', None) is not None:
+                delattr(platform, name)
+        platform.instruments = None
+        self.platform = None
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            local = self.local
+            outer_scanned = getattr(local, 'scanned', 0)
+            local.scanned = 0
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                scanned = local.scanned
+                local.scanned = outer_scanned + scanned
+            self.record(name, time.perf_counter() - start, scanned, _row_count(result))
+            return result
+        return wrapper
+
+    def scanned(self, rows):
+        self.local.scanned = getattr(self.local, 'scanned', 0) + rows
+
+    def record(self, name, seconds, scanned=0, returned=None):
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = CallStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.samples.append(seconds)
+            stats.scanned += scanned
+            stats.returned += returned or 0
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+
+    def report(self):
+        with self.lock:
+            return {name: stats.report() for name, stats in sorted(self.stats.items())}
+
+    def dump_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+    # cProfile
+    def start_profile(self):
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_profile(self, path=None, limit=40):
+        # Stops profiling; saves the raw stats to `path` if given and returns
+        # the top functions by cumulative time as text
+        profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return ""
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
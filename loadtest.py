@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from GUI import EcommercePlatform
+from server import ShopServer
+
+
+def request(base_url, method, path, body=None, session=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method)
+    req.add_header('Content-Type', 'application/json')
+    if session:
+        req.add_header('X-Session', session)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read() or b'{}')
+
+
+def shopper(base_url, customer_id, trips, terms, latencies, errors, seed):
+    # One customer: log in, then search, fill a cart, view it and check out `trips` times
+    rng = random.Random(seed)
+
+    def timed(method, path, body=None, session=None):
+        start = time.perf_counter()
+        status, payload = request(base_url, method, path, body, session)
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append((method, path, status, payload.get('error')))
+        return payload
+
+    session = timed('POST', '/sessions', {'customer_id': customer_id}).get('session')
+    if not session:
+        return
+    for _ in range(trips):
+        products = timed('GET', '/products?q={}&limit=20'.format(rng.choice(terms))).get('products') or []
+        for product in rng.sample(products, min(3, len(products))):
+            timed('POST', '/cart/items', {'product_id': product['product_id']}, session)
+        timed('GET', '/cart', session=session)
+        if products:
+            timed('POST', '/cart/checkout', session=session)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run(base_url, shoppers, trips, terms):
+    customer_ids = []
+    for i in range(shoppers):
+        status, payload = request(base_url, 'POST', '/customers', {
+            'name': "Load Shopper {}".format(i), 'contact_number': "555-000-0000", 'shipping_address': "1 Test St"
+        })
+        customer_ids.append(payload['customer_id'])
+
+    latencies = []
+    errors = []
+    threads = [threading.Thread(target=shopper, args=(base_url, customer_id, trips, terms, latencies, errors, i))
+               for i, customer_id in enumerate(customer_ids)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print("{} shoppers x {} trips: {} requests in {:.2f}s ({:.0f} req/s), {} errors".format(
+        shoppers, trips, len(latencies), elapsed, len(latencies) / elapsed, len(errors)))
+    print("latency p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms".format(
+        percentile(latencies, 0.50) * 1000, percentile(latencies, 0.95) * 1000, percentile(latencies, 0.99) * 1000))
+    for error in errors[:10]:
+        print("  error: {}".format(error))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure throughput and latency of the HTTP service with concurrent shoppers")
+    parser.add_argument('--url', help="running server to test; by default an in-memory server is started")
+    parser.add_argument('--shoppers', type=int, default=20)
+    parser.add_argument('--trips', type=int, default=10)
+    parser.add_argument('--terms', default="phone,jeans,coffee,e,leather", help="comma separated search terms")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server = ShopServer(('127.0.0.1', 0), EcommercePlatform())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = "http://127.0.0.1:{}".format(server.server_address[1])
+    try:
+        run(base_url.rstrip('/'), args.shoppers, args.trips, args.terms.split(','))
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import mmap
+import os
+import pickle
+import re
+import struct
+import threading
+import zlib
+
+from storage import TABLES
+
+# Seconds between fsyncs of the operation log; writes made within this window
+# are batched into one fsync (group commit) and are what a crash can lose
+LOG_FSYNC_INTERVAL = 0.01
+
+# A snapshot is written once this many operations have been logged since the last one
+SNAPSHOT_EVERY_OPS = 100000
+
+# How often (seconds) the snapshot thread checks whether a snapshot is due
+SNAPSHOT_CHECK_INTERVAL = 5.0
+
+# Each log record is: payload length, CRC32 of the payload, pickled operation
+RECORD_HEADER = struct.Struct('<II')
+
+FILE_PATTERN = re.compile(r'(log|snapshot)-(\d{6})\.(bin|pkl)$')
+
+
+def _replace(row, table, column, value):
+    index = TABLES[table].index(column)
+    return row[:index] + (value,) + row[index + 1:]
+
+
+def _log_path(directory, generation):
+    return os.path.join(directory, "log-{:06d}.bin".format(generation))
+
+
+def _snapshot_path(directory, generation):
+    return os.path.join(directory, "snapshot-{:06d}.pkl".format(generation))
+
+
+class LogStorage:
+    # Storage backend made of an append-only operation log plus periodic snapshots.
+    # Generation g consists of snapshot g (the state when log g was started; absent
+    # for g = 0) and log g. On startup the newest complete snapshot is loaded with
+    # mmap and only the logs from that generation on are replayed.
+    def __init__(self, directory, fsync_interval=LOG_FSYNC_INTERVAL, snapshot_every=SNAPSHOT_EVERY_OPS):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.fsync_lock = threading.Lock()
+        self.platform = None
+        self.closing = threading.Event()
+        self.dirty = False
+        self.ops_since_snapshot = 0
+
+        self.recovered = self._recover()
+        self.log = open(_log_path(directory, self.generation), 'ab')
+
+        self.flusher = threading.Thread(target=self._flush_loop, name="log-flusher", daemon=True)
+        self.flusher.start()
+        self.snapshotter = None
+
+    # Recovery
+    def _generations(self, kind):
+        found = []
+        for name in os.listdir(self.directory):
+            match = FILE_PATTERN.match(name)
+            if match and match.group(1) == kind:
+                found.append(int(match.group(2)))
+        return sorted(found)
+
+    def _recover(self):
+        state = {table: {} for table in TABLES}
+        snapshots = self._generations('snapshot')
+        self.generation = snapshots[-1] if snapshots else 0
+        if snapshots:
+            self._load_snapshot(_snapshot_path(self.directory, self.generation), state)
+
+        logs = [g for g in self._generations('log') if g >= self.generation]
+        for generation in logs:
+            self.ops_since_snapshot += self._replay(_log_path(self.directory, generation), state)
+        if logs:
+            self.generation = logs[-1]
+        return state
+
+    def _load_snapshot(self, path, state):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                tables = pickle.loads(data)
+        for table, rows in tables.items():
+            rows_by_id = state[table]
+            for row in rows:
+                rows_by_id[row[0]] = row
+
+    def _replay(self, path, state):
+        # Applies every complete record; a torn or corrupt tail is cut off
+        applied = 0
+        with open(path, 'r+b') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offset = 0
+                while offset + RECORD_HEADER.size <= size:
+                    length, crc = RECORD_HEADER.unpack_from(data, offset)
+                    start = offset + RECORD_HEADER.size
+                    payload = data[start:start + length]
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        break
+                    self._apply(pickle.loads(payload), state)
+                    applied += 1
+                    offset = start + length
+            if offset < size:
+                f.truncate(offset)
+        return applied
+
+    def _apply(self, op, state):
+        kind = op[0]
+        if kind == 'insert':
+            table, rows = op[1], op[2]
+            rows_by_id = state[table]
+            for row in rows:
+                rows_by_id[row[0]] = row
+        elif kind == 'status':
+            order_id, status, item_prices = op[1], op[2], op[3]
+            order = state['orders'].get(order_id)
+            if order:
+                state['orders'][order_id] = _replace(order, 'orders', 'status', status)
+            items = state['order_items']
+            for unit_price, order_item_id in item_prices:
+                item = items.get(order_item_id)
+                if item:
+                    items[order_item_id] = _replace(item, 'order_items', 'unit_price', unit_price)
+        elif kind == 'delete_item':
+            state['order_items'].pop(op[1], None)
+        elif kind == 'quantities':
+            items = state['order_items']
+            for quantity, order_item_id in op[1]:
+                item = items.get(order_item_id)
+                if item:
+                    items[order_item_id] = _replace(item, 'order_items', 'quantity', quantity)
+        elif kind == 'vendor_scores':
+            vendors = state['vendors']
+            for feedback_score, vendor_id in op[1]:
+                vendor = vendors.get(vendor_id)
+                if vendor:
+                    vendors[vendor_id] = _replace(vendor, 'vendors', 'feedback_score', feedback_score)
+
+    # Storage interface
+    def attach(self, platform):
+        # The platform supplies the rows for snapshots
+        self.platform = platform
+        if self.snapshotter is None:
+            self.snapshotter = threading.Thread(target=self._snapshot_loop, name="log-snapshot", daemon=True)
+            self.snapshotter.start()
+
+    def is_empty(self):
+        return not self.recovered['vendors']
+
+    def load(self, table):
+        columns = TABLES[table]
+        rows_by_id = self.recovered[table]
+        for record_id in sorted(rows_by_id):
+            yield dict(zip(columns, rows_by_id[record_id]))
+        # Recovered rows are only needed once
+        self.recovered[table] = {}
+
+    def insert(self, table, record):
+        self.insert_many(table, [record])
+
+    def insert_many(self, table, records):
+        columns = TABLES[table]
+        rows = [tuple(record[column] for column in columns) for record in records]
+        if rows:
+            self._append(('insert', table, rows))
+
+    def update_order_status(self, order_id, status, item_prices=()):
+        self._append(('status', order_id, status, list(item_prices)))
+
+    def delete_order_item(self, order_item_id):
+        self._append(('delete_item', order_item_id))
+
+    def update_item_quantities(self, quantities):
+        self._append(('quantities', list(quantities)))
+
+    def update_vendor_scores(self, scores):
+        self._append(('vendor_scores', list(scores)))
+
+    def close(self):
+        if self.closing.is_set():
+            return
+        self.closing.set()
+        self.flusher.join()
+        if self.snapshotter:
+            self.snapshotter.join()
+        with self.lock:
+            self._sync()
+            self.log.close()
+
+    # Log writing
+    def _append(self, op):
+        payload = pickle.dumps(op, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.log.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            self.log.write(payload)
+            self.dirty = True
+            self.ops_since_snapshot += 1
+
+    def _sync(self):
+        # Caller holds self.lock
+        with self.fsync_lock:
+            self.log.flush()
+            os.fsync(self.log.fileno())
+        self.dirty = False
+
+    def sync(self):
+        # Blocks until everything logged so far is on disk
+        with self.lock:
+            self._sync()
+
+    def _flush_loop(self):
+        while not self.closing.wait(self.fsync_interval):
+            with self.lock:
+                if not self.dirty:
+                    continue
+                self.log.flush()
+                self.dirty = False
+                fd = self.log.fileno()
+                # fsync outside self.lock so writers keep appending meanwhile;
+                # fsync_lock keeps a rotation from closing this file underneath it
+                self.fsync_lock.acquire()
+            try:
+                os.fsync(fd)
+            finally:
+                self.fsync_lock.release()
+
+    # Snapshots
+    def _snapshot_loop(self):
+        while not self.closing.wait(SNAPSHOT_CHECK_INTERVAL):
+            if self.ops_since_snapshot >= self.snapshot_every:
+                self.snapshot()
+
+    def snapshot(self):
+        # Rows are copied and the log rotated while no platform writer is active,
+        # so the snapshot matches the start of the new log exactly
+        platform = self.platform
+        platform.lock.acquire_read()
+        try:
+            tables = {
+                table: [tuple(record[column] for column in TABLES[table]) for record in platform.tables[table][0]]
+                for table in TABLES
+            }
+            with self.lock:
+                self._sync()
+                self.log.close()
+                self.generation += 1
+                generation = self.generation
+                self.log = open(_log_path(self.directory, generation), 'ab')
+                self.ops_since_snapshot = 0
+        finally:
+            platform.lock.release_read()
+
+        path = _snapshot_path(self.directory, generation)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+        # Older generations are covered by the new snapshot
+        for kind, path_of in (('log', _log_path), ('snapshot', _snapshot_path)):
+            for old in self._generations(kind):
+                if old < generation:
+                    os.remove(path_of(self.directory, old))
+        return generation
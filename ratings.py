@@ -0,0 +1,73 @@
+import bisect
+
+# Ratings a customer can give a vendor for a completed order
+MIN_RATING = 1
+MAX_RATING = 5
+
+# Vendors are ranked by a Bayesian average: every vendor starts with
+# PRIOR_RATINGS ratings of PRIOR_SCORE, so a handful of perfect ratings does not
+# outrank a long record of good ones
+PRIOR_SCORE = 3.0
+PRIOR_RATINGS = 5
+
+
+class VendorRatings:
+    # Rating totals and the vendor leaderboard of an EcommercePlatform. The
+    # platform reports new vendors and ratings; each rating updates the vendor's
+    # running count and sum, its feedback_score (the plain mean) and its place in
+    # `ranked`, a list of (-score, vendor_id) kept sorted with bisect, so the top
+    # vendors are a slice and a vendor's rank is a binary search.
+    def __init__(self, platform):
+        self.platform = platform
+        self.counts = {}
+        self.sums = {}
+        self.scores = {}
+        self.ranked = []
+
+    def vendor_added(self, vendor):
+        # Vendors are added unrated, and usually sort after every rated vendor
+        # at least as good as the prior, so this is near the end of the list
+        vendor_id = vendor['vendor_id']
+        self.scores[vendor_id] = PRIOR_SCORE
+        bisect.insort(self.ranked, (-PRIOR_SCORE, vendor_id))
+
+    def rating_added(self, rating):
+        vendor = self.platform.vendor_index.get(rating['vendor_id'])
+        if vendor is None:
+            return
+        vendor_id = vendor['vendor_id']
+        count = self.counts[vendor_id] = self.counts.get(vendor_id, 0) + 1
+        total = self.sums[vendor_id] = self.sums.get(vendor_id, 0) + rating['rating']
+        vendor['feedback_score'] = total / count
+
+        old_score = self.scores[vendor_id]
+        new_score = (PRIOR_SCORE * PRIOR_RATINGS + total) / (PRIOR_RATINGS + count)
+        del self.ranked[bisect.bisect_left(self.ranked, (-old_score, vendor_id))]
+        bisect.insort(self.ranked, (-new_score, vendor_id))
+        self.scores[vendor_id] = new_score
+
+    def score(self, vendor_id):
+        return self.scores.get(vendor_id, PRIOR_SCORE)
+
+    # Queries
+    def top(self, offset=0, end=None):
+        # Vendor ids from best to worst
+        return [vendor_id for score, vendor_id in self.ranked[offset:end]]
+
+    def rank(self, vendor_id):
+        # 1 for the best vendor; ties go to the lower vendor id
+        if vendor_id not in self.scores:
+            return None
+        return bisect.bisect_left(self.ranked, (-self.scores[vendor_id], vendor_id)) + 1
+
+    def summary(self, vendor_id):
+        vendor = self.platform.vendor_index.get(vendor_id)
+        if vendor is None:
+            return None
+        return {
+            'vendor_id': vendor_id,
+            'ratings': self.counts.get(vendor_id, 0),
+            'feedback_score': vendor['feedback_score'],
+            'score': self.score(vendor_id),
+            'rank': self.rank(vendor_id),
+        }
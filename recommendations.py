@@ -0,0 +1,92 @@
+import heapq
+
+# Neighbors kept per product for "also bought" answers
+NEIGHBORS_PER_PRODUCT = 20
+
+
+class Recommendations:
+    # "Customers also bought" for an EcommercePlatform. Keeps a sparse count of
+    # completed orders containing each pair of distinct products, and per product
+    # its best NEIGHBORS_PER_PRODUCT neighbors by count. The platform reports cart
+    # and order status changes, as it does to SalesAnalytics; only completed
+    # orders count, so an order leaving 'completed' is subtracted again.
+    def __init__(self, platform, neighbors=NEIGHBORS_PER_PRODUCT):
+        self.platform = platform
+        self.neighbors = neighbors
+        self.counts = {}
+        self.top = {}
+        # Products whose top neighbors may miss a product after a count went down
+        self.stale = set()
+
+    def _order_products(self, order_id):
+        return {item['product_id'] for item in self.platform.order_items_by_order.get(order_id, {}).values()}
+
+    def _completed(self, order_id):
+        order = self.platform.order_index.get(order_id)
+        return order is not None and order['status'] == 'completed'
+
+    # Updates
+    def item_added(self, item):
+        # Called after the item is in its order
+        if not self._completed(item['order_id']):
+            return
+        items = self.platform.order_items_by_order.get(item['order_id'], {}).values()
+        products = {other['product_id'] for other in items if other is not item}
+        if item['product_id'] not in products:
+            self._change_pairs(item['product_id'], products, 1)
+
+    def item_removed(self, item):
+        # Called after the item has left its order
+        if not self._completed(item['order_id']):
+            return
+        products = self._order_products(item['order_id'])
+        if item['product_id'] not in products:
+            self._change_pairs(item['product_id'], products, -1)
+
+    def status_changed(self, order, old_status):
+        if (old_status == 'completed') == (order['status'] == 'completed'):
+            return
+        sign = 1 if order['status'] == 'completed' else -1
+        products = list(self._order_products(order['order_id']))
+        for i, product_id in enumerate(products):
+            self._change_pairs(product_id, products[i + 1:], sign)
+
+    def _change_pairs(self, product_id, others, delta):
+        for other in others:
+            self._change(product_id, other, delta)
+            self._change(other, product_id, delta)
+
+    def _change(self, product_id, other, delta):
+        neighbors = self.counts.setdefault(product_id, {})
+        count = neighbors.get(other, 0) + delta
+        if count > 0:
+            neighbors[other] = count
+        else:
+            neighbors.pop(other, None)
+
+        top = self.top.setdefault(product_id, {})
+        if other in top:
+            if count > 0:
+                top[other] = count
+            else:
+                del top[other]
+            if delta < 0 and len(neighbors) > len(top):
+                self.stale.add(product_id)
+        elif count > 0 and product_id not in self.stale:
+            if len(top) < self.neighbors:
+                top[other] = count
+            else:
+                weakest = min(top, key=top.get)
+                if count > top[weakest]:
+                    del top[weakest]
+                    top[other] = count
+
+    # Queries
+    def also_bought(self, product_id, k=10):
+        # [(product_id, orders bought together)], most often first
+        if product_id in self.stale:
+            neighbors = self.counts.get(product_id, {})
+            self.top[product_id] = dict(heapq.nlargest(self.neighbors, neighbors.items(), key=lambda entry: entry[1]))
+            self.stale.discard(product_id)
+        top = self.top.get(product_id, {})
+        return sorted(top.items(), key=lambda entry: (-entry[1], entry[0]))[:k]
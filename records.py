@@ -0,0 +1,122 @@
+import datetime
+import sys
+
+from storage import TABLES
+
+# Order dates are kept as seconds since the epoch; older databases and imports
+# may still hold them as strings in this format
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.strptime(value, DATE_FORMAT).timestamp()
+
+
+def format_timestamp(timestamp, date_format=DATE_FORMAT):
+    return datetime.datetime.fromtimestamp(timestamp).strftime(date_format)
+
+
+class Record:
+    # Row object with one slot per column instead of a per-row dict.
+    # It supports the dict operations the platform and GUI use (record['name'],
+    # get, keys, items, copy, dict(record)), so code written against dicts keeps working.
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, **fields):
+        for field in self.FIELDS:
+            setattr(self, field, fields.get(field))
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, dict(self.items()))
+
+    def get(self, key, default=None):
+        if key not in self.FIELDS:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return self.FIELDS
+
+    def values(self):
+        return [getattr(self, field) for field in self.FIELDS]
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.FIELDS]
+
+    def copy(self):
+        # A plain dict, so callers can add extra keys (e.g. vendor_name)
+        return dict(self.items())
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class VendorRecord(Record):
+    __slots__ = FIELDS = TABLES['vendors']
+
+
+class ProductRecord(Record):
+    __slots__ = FIELDS = TABLES['products']
+
+    def __init__(self, **fields):
+        Record.__init__(self, **fields)
+        # Tags repeat across many products, so share one string per distinct tag
+        self.tag1 = _intern(self.tag1)
+        self.tag2 = _intern(self.tag2)
+        self.tag3 = _intern(self.tag3)
+
+
+class CustomerRecord(Record):
+    __slots__ = FIELDS = TABLES['customers']
+
+
+class OrderRecord(Record):
+    __slots__ = FIELDS = TABLES['orders']
+
+    def __init__(self, **fields):
+        Record.__init__(self, **fields)
+        self.order_date = parse_timestamp(self.order_date)
+        self.status = _intern(self.status)
+
+
+class OrderItemRecord(Record):
+    __slots__ = FIELDS = TABLES['order_items']
+
+
+class RatingRecord(Record):
+    __slots__ = FIELDS = TABLES['ratings']
+
+    def __init__(self, **fields):
+        Record.__init__(self, **fields)
+        self.rated_at = parse_timestamp(self.rated_at)
@@ -0,0 +1,102 @@
+import re
+
+# Regions vendors can be present in; region i is bit 1 << i of a region mask
+REGIONS = ("North America", "South America", "Europe", "Asia", "Africa", "Australia")
+ALL_REGIONS = (1 << len(REGIONS)) - 1
+
+# Other names found in geographical_presence and shipping addresses (lower case)
+REGION_ALIASES = {
+    'north america': 0, 'na': 0, 'usa': 0, 'us': 0, 'united states': 0, 'canada': 0, 'mexico': 0,
+    'south america': 1, 'sa': 1, 'latin america': 1, 'brazil': 1, 'argentina': 1, 'chile': 1,
+    'europe': 2, 'eu': 2, 'uk': 2, 'united kingdom': 2, 'germany': 2, 'france': 2, 'spain': 2, 'italy': 2,
+    'asia': 3, 'china': 3, 'hong kong': 3, 'japan': 3, 'india': 3, 'singapore': 3, 'korea': 3,
+    'africa': 4, 'nigeria': 4, 'egypt': 4, 'kenya': 4, 'south africa': 4,
+    'australia': 5, 'oceania': 5, 'new zealand': 5,
+}
+GLOBAL_NAMES = {'global', 'worldwide', 'international'}
+
+SEPARATORS = re.compile(r'\s*(?:,|;|/|&|\band\b)\s*')
+
+
+def region_mask(presence):
+    # "North America, Europe" -> mask of both; "Global" -> ALL_REGIONS. Unknown
+    # names are ignored, so text naming no known region gives 0.
+    mask = 0
+    for name in SEPARATORS.split((presence or "").strip().lower()):
+        if name in GLOBAL_NAMES:
+            return ALL_REGIONS
+        if name in REGION_ALIASES:
+            mask |= 1 << REGION_ALIASES[name]
+    return mask
+
+
+def address_region(address):
+    # Region of a shipping address, from its last part that names one
+    # ("123 Main St, Anytown, USA" -> North America); 0 if none does
+    for part in reversed((address or "").split(',')):
+        mask = region_mask(part)
+        if mask and mask != ALL_REGIONS:
+            return mask
+    return 0
+
+
+def as_mask(regions):
+    # A mask from a mask, one region text, or a list of region texts; None stays None
+    if regions is None or isinstance(regions, int):
+        return regions
+    if isinstance(regions, str):
+        return region_mask(regions)
+    mask = 0
+    for region in regions:
+        mask |= region_mask(region)
+    return mask
+
+
+class RegionIndex:
+    # Region masks of the vendors and customers of an EcommercePlatform, with the
+    # products of each region. Products of vendors present in every region are
+    # kept once, in global_products, instead of in every region's set. The
+    # platform reports new vendors, products and customers.
+    def __init__(self, platform):
+        self.platform = platform
+        self.vendor_masks = {}
+        self.customer_masks = {}
+        self.region_products = [set() for _ in REGIONS]
+        self.global_products = set()
+
+    def vendor_added(self, vendor):
+        # Presence naming no known region ("Southeast Asia") is treated like
+        # "Global", as customer_region does, so region filters never hide the vendor
+        mask = region_mask(vendor['geographical_presence']) or ALL_REGIONS
+        self.vendor_masks[vendor['vendor_id']] = mask
+
+    def products_added(self, products):
+        masks = self.vendor_masks
+        for product in products:
+            mask = masks.get(product['vendor_id'], 0)
+            if mask == ALL_REGIONS:
+                self.global_products.add(product['product_id'])
+                continue
+            for i in range(len(REGIONS)):
+                if mask & (1 << i):
+                    self.region_products[i].add(product['product_id'])
+
+    def customer_added(self, customer):
+        self.customer_masks[customer['customer_id']] = address_region(customer['shipping_address'])
+
+    # Queries
+    def customer_region(self, customer_id):
+        # ALL_REGIONS when the address names no known region, so it filters nothing
+        return self.customer_masks.get(customer_id) or ALL_REGIONS
+
+    def vendor_mask(self, vendor_id):
+        return self.vendor_masks.get(vendor_id, 0)
+
+    def product_count(self, mask):
+        # Upper bound of products(mask), for choosing the smallest filter
+        return len(self.global_products) + sum(len(self.region_products[i])
+                                               for i in range(len(REGIONS)) if mask & (1 << i))
+
+    def products(self, mask):
+        selected = [self.region_products[i] for i in range(len(REGIONS)) if mask & (1 << i)]
+        return self.global_products.union(*selected) if selected else set()
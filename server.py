@@ -0,0 +1,458 @@
+import argparse
+import collections
+import json
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from GUI import DATABASE_PATH, PAGE_SIZE, EcommercePlatform, OrderError
+from facets import SORTS
+from instrumentation import Instrumentation
+from logstorage import LogStorage
+from sharding import ShardedPlatform
+from storage import SQLiteStorage
+
+# Threads handling HTTP requests
+SERVER_WORKERS = 16
+
+# Sessions not used for this long are ended
+SESSION_TTL_SECONDS = 30 * 60
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+class ShopService:
+    # HTTP-independent handlers. Each session has its own customer and cart, so
+    # unlike the GUI's current_user/current_order many shoppers can be active at once.
+    def __init__(self, platform):
+        self.platform = platform
+        # token -> session, least recently used first, so expired sessions are
+        # ended from the front
+        self.sessions = collections.OrderedDict()
+        self.sessions_lock = threading.Lock()
+
+    def _session(self, token):
+        now = time.monotonic()
+        with self.sessions_lock:
+            self._end_expired_sessions(now)
+            session = self.sessions.get(token)
+            if session:
+                session['last_used'] = now
+                self.sessions.move_to_end(token)
+        if not session:
+            raise ServiceError(401, "Unknown, expired or missing session")
+        return session
+
+    def _end_expired_sessions(self, now):
+        while self.sessions:
+            token, session = next(iter(self.sessions.items()))
+            if now - session['last_used'] <= SESSION_TTL_SECONDS:
+                break
+            del self.sessions[token]
+
+    def _int(self, value, name):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ServiceError(400, "{} must be an integer".format(name))
+
+    def _page(self, query):
+        offset = self._int(query.get('offset', 0), 'offset')
+        limit = self._int(query.get('limit', PAGE_SIZE), 'limit')
+        if offset < 0:
+            raise ServiceError(400, "offset must not be negative")
+        if limit < 1:
+            raise ServiceError(400, "limit must be at least 1")
+        return offset, min(limit, PAGE_SIZE)
+
+    # Sessions
+    def login(self, body):
+        customer = self.platform.get_customer(self._int(body.get('customer_id'), 'customer_id'))
+        if not customer:
+            raise ServiceError(404, "Customer not found")
+        token = secrets.token_hex(16)
+        now = time.monotonic()
+        with self.sessions_lock:
+            self._end_expired_sessions(now)
+            self.sessions[token] = {'customer_id': customer['customer_id'], 'order_id': None,
+                                    'lock': threading.Lock(), 'last_used': now}
+        return {'session': token, 'customer': customer.copy()}
+
+    def logout(self, token):
+        # The session's cart stays a pending order of the customer
+        with self.sessions_lock:
+            if self.sessions.pop(token, None) is None:
+                raise ServiceError(401, "Unknown, expired or missing session")
+        return {'session': None}
+
+    def register(self, body):
+        if not (body.get('name') and body.get('contact_number') and body.get('shipping_address')):
+            raise ServiceError(400, "name, contact_number and shipping_address are required")
+        customer_id = self.platform.add_customer(body['name'], body['contact_number'], body['shipping_address'])
+        return {'customer_id': customer_id}
+
+    # Catalog
+    def _float(self, query, name):
+        if name not in query:
+            return None
+        try:
+            return float(query[name])
+        except ValueError:
+            raise ServiceError(400, "{} must be a number".format(name))
+
+    def _list(self, query, name):
+        return query[name].split(',') if query.get(name) else None
+
+    def _region(self, query, token):
+        # ?region=Europe,Asia, or ?my_region=1 for the region of the session's
+        # shipping address; None for no region filter
+        if query.get('my_region') == '1':
+            return self.platform.customer_region(self._session(token)['customer_id'])
+        return self._list(query, 'region')
+
+    def search(self, query, token=None):
+        offset, limit = self._page(query)
+        vendor_ids = self._list(query, 'vendor')
+        if vendor_ids is not None:
+            vendor_ids = [self._int(vendor_id, 'vendor') for vendor_id in vendor_ids]
+        sort = query.get('sort', 'relevance')
+        if sort not in SORTS:
+            raise ServiceError(400, "sort must be one of {}".format(", ".join(SORTS)))
+        result = self.platform.query_products(
+            query.get('q', ''), self._float(query, 'min_price'), self._float(query, 'max_price'),
+            vendor_ids, self._list(query, 'tag'), self._region(query, token), sort, offset + limit,
+            query.get('facets') == '1'
+        )
+        return {
+            'total': result['total'],
+            'products': self.platform.product_results(result['product_ids'][offset:]),
+            'facets': result['facets']
+        }
+
+    def also_bought(self, product_id, query):
+        if not self.platform.get_product(product_id):
+            raise ServiceError(404, "Product not found")
+        limit = self._int(query.get('limit', 10), 'limit')
+        return {'products': [{'product_id': other, 'orders': count}
+                             for other, count in self.platform.also_bought(product_id, limit)]}
+
+    def list_vendors(self, query):
+        # ?sort=score lists the best rated vendors first
+        offset, limit = self._page(query)
+        sort = query.get('sort', 'id')
+        if sort not in ('id', 'score'):
+            raise ServiceError(400, "sort must be id or score")
+        list_vendors = self.platform.top_vendors if sort == 'score' else self.platform.list_all_vendors
+        return {
+            'total': self.platform.count_vendors(),
+            'vendors': [vendor.copy() for vendor in list_vendors(offset, limit)]
+        }
+
+    def vendor_rating(self, vendor_id):
+        rating = self.platform.vendor_rating(vendor_id)
+        if not rating:
+            raise ServiceError(404, "Vendor not found")
+        return rating
+
+    def vendor_products(self, vendor_id, query, token=None):
+        offset, limit = self._page(query)
+        region = self._region(query, token)
+        return {
+            'total': self.platform.count_vendor_products(vendor_id, region),
+            'products': [product.copy() for product in self.platform.list_vendor_products(vendor_id, offset, limit, region)]
+        }
+
+    def add_vendor(self, body):
+        if not (body.get('business_name') and body.get('geographical_presence')):
+            raise ServiceError(400, "business_name and geographical_presence are required")
+        return {'vendor_id': self.platform.add_vendor(body['business_name'], body['geographical_presence'])}
+
+    def add_product(self, body):
+        vendor_id = self._int(body.get('vendor_id'), 'vendor_id')
+        if not self.platform.get_vendor(vendor_id):
+            raise ServiceError(404, "Vendor not found")
+        try:
+            price = float(body.get('price'))
+        except (TypeError, ValueError):
+            raise ServiceError(400, "price must be a number")
+        if not body.get('name'):
+            raise ServiceError(400, "name is required")
+        product_id = self.platform.add_product(vendor_id, body['name'], price,
+                                               body.get('tag1'), body.get('tag2'), body.get('tag3'))
+        return {'product_id': product_id}
+
+    # Cart
+    def cart(self, token):
+        session = self._session(token)
+        order_id = session['order_id']
+        items = self.platform.get_order_items(order_id) if order_id else []
+        return {'order_id': order_id, 'items': [item.copy() for item in items]}
+
+    def add_to_cart(self, token, body):
+        session = self._session(token)
+        product = self.platform.get_product(self._int(body.get('product_id'), 'product_id'))
+        if not product:
+            raise ServiceError(404, "Product not found")
+        quantity = self._int(body.get('quantity', 1), 'quantity')
+        if quantity < 1:
+            raise ServiceError(400, "quantity must be at least 1")
+
+        with session['lock']:
+            if not session['order_id']:
+                session['order_id'] = self.platform.create_order(session['customer_id'])
+            try:
+                order_item_id = self.platform.add_to_order(session['order_id'], product['product_id'],
+                                                           product['vendor_id'], quantity)
+            except OrderError as error:
+                raise ServiceError(409, str(error))
+        return {'order_id': session['order_id'], 'order_item_id': order_item_id}
+
+    def _cart_items(self, body, minimum):
+        items = body.get('items')
+        if not isinstance(items, list) or not items:
+            raise ServiceError(400, "items must be a non-empty list")
+        pairs = []
+        for item in items:
+            if not isinstance(item, dict):
+                raise ServiceError(400, "each item needs a product_id and a quantity")
+            quantity = self._int(item.get('quantity', 1), 'quantity')
+            if quantity < minimum:
+                raise ServiceError(400, "quantity must be at least {}".format(minimum))
+            pairs.append((self._int(item.get('product_id'), 'product_id'), quantity))
+        return pairs
+
+    def add_many_to_cart(self, token, body):
+        # {"items": [{"product_id": 1, "quantity": 2}, ...]}; one line per product
+        return self._change_cart(token, self._cart_items(body, 1), self.platform.add_items_to_order)
+
+    def set_cart_quantities(self, token, body):
+        # Same body as add_many_to_cart; quantity 0 removes the product
+        return self._change_cart(token, self._cart_items(body, 0), self.platform.set_order_quantities)
+
+    def _change_cart(self, token, pairs, change):
+        session = self._session(token)
+        with session['lock']:
+            if not session['order_id']:
+                session['order_id'] = self.platform.create_order(session['customer_id'])
+            try:
+                lines = change(session['order_id'], pairs)
+            except OrderError as error:
+                raise ServiceError(409, str(error))
+        return {'order_id': session['order_id'],
+                'order_item_ids': {str(product_id): item_id for product_id, item_id in lines.items()}}
+
+    def remove_from_cart(self, token, order_item_id):
+        session = self._session(token)
+        with session['lock']:
+            items = self.platform.get_order_items(session['order_id']) if session['order_id'] else []
+            if not any(item['order_item_id'] == order_item_id for item in items):
+                raise ServiceError(404, "Item not in cart")
+            try:
+                self.platform.remove_from_order(order_item_id)
+            except OrderError as error:
+                raise ServiceError(409, str(error))
+        return {'removed': order_item_id}
+
+    def checkout(self, token):
+        return self._close_cart(token, self.platform.checkout_order)
+
+    def cancel(self, token):
+        return self._close_cart(token, self.platform.cancel_order)
+
+    def _close_cart(self, token, close):
+        session = self._session(token)
+        with session['lock']:
+            order_id = session['order_id']
+            if not order_id:
+                raise ServiceError(409, "No active order")
+            try:
+                close(order_id)
+            except OrderError as error:
+                raise ServiceError(409, str(error))
+            session['order_id'] = None
+        order = self.platform.get_order(order_id)
+        return {'order_id': order_id, 'status': order['status']}
+
+    # Order history
+    def orders(self, token, query):
+        session = self._session(token)
+        offset, limit = self._page(query)
+        before = self._int(query['before'], 'before') if 'before' in query else None
+        orders = self.platform.get_customer_orders(session['customer_id'], offset, limit, before)
+        return {
+            'total': self.platform.count_customer_orders(session['customer_id']),
+            'orders': [order.copy() for order in orders],
+            'next_before': orders[-1]['order_id'] if orders and len(orders) == limit else None
+        }
+
+    # Diagnostics
+    def diagnostics(self):
+        if not self.platform.instruments:
+            raise ServiceError(404, "Instrumentation is not enabled (start the server with --instrument)")
+        return self.platform.instruments.report()
+
+    def order_details(self, token, order_id):
+        session = self._session(token)
+        order = self.platform.get_order(order_id)
+        if not order or order['customer_id'] != session['customer_id']:
+            raise ServiceError(404, "Order not found")
+        return {'order': order.copy(), 'items': [item.copy() for item in self.platform.get_order_items(order_id)]}
+
+    def rate_vendor(self, token, order_id, body):
+        session = self._session(token)
+        order = self.platform.get_order(order_id)
+        if not order or order['customer_id'] != session['customer_id']:
+            raise ServiceError(404, "Order not found")
+        vendor_id = self._int(body.get('vendor_id'), 'vendor_id')
+        rating = self._int(body.get('rating'), 'rating')
+        try:
+            rating_id = self.platform.rate_vendor(order_id, vendor_id, rating)
+        except OrderError as error:
+            raise ServiceError(409, str(error))
+        return {'rating_id': rating_id, 'vendor': self.platform.vendor_rating(vendor_id)}
+
+
+# (method, path pattern, handler); handlers get (service, request, *ids from the path)
+ROUTES = [
+    ('POST', r'/sessions', lambda s, r: s.login(r.body)),
+    ('DELETE', r'/sessions', lambda s, r: s.logout(r.session)),
+    ('POST', r'/customers', lambda s, r: s.register(r.body)),
+    ('GET', r'/products', lambda s, r: s.search(r.query, r.session)),
+    ('POST', r'/products', lambda s, r: s.add_product(r.body)),
+    ('GET', r'/products/(\d+)/also-bought', lambda s, r, product_id: s.also_bought(product_id, r.query)),
+    ('GET', r'/vendors', lambda s, r: s.list_vendors(r.query)),
+    ('POST', r'/vendors', lambda s, r: s.add_vendor(r.body)),
+    ('GET', r'/vendors/(\d+)/rating', lambda s, r, vendor_id: s.vendor_rating(vendor_id)),
+    ('GET', r'/vendors/(\d+)/products', lambda s, r, vendor_id: s.vendor_products(vendor_id, r.query, r.session)),
+    ('GET', r'/cart', lambda s, r: s.cart(r.session)),
+    ('POST', r'/cart/items', lambda s, r: s.add_to_cart(r.session, r.body)),
+    ('POST', r'/cart/items/batch', lambda s, r: s.add_many_to_cart(r.session, r.body)),
+    ('PUT', r'/cart/items', lambda s, r: s.set_cart_quantities(r.session, r.body)),
+    ('DELETE', r'/cart/items/(\d+)', lambda s, r, item_id: s.remove_from_cart(r.session, item_id)),
+    ('POST', r'/cart/checkout', lambda s, r: s.checkout(r.session)),
+    ('POST', r'/cart/cancel', lambda s, r: s.cancel(r.session)),
+    ('GET', r'/orders', lambda s, r: s.orders(r.session, r.query)),
+    ('GET', r'/orders/(\d+)', lambda s, r, order_id: s.order_details(r.session, order_id)),
+    ('POST', r'/orders/(\d+)/ratings', lambda s, r, order_id: s.rate_vendor(r.session, order_id, r.body)),
+    ('GET', r'/diagnostics', lambda s, r: s.diagnostics()),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern + '$'), handler) for method, pattern, handler in ROUTES]
+
+
+class ShopRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method):
+        url = urlparse(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.session = self.headers.get('X-Session')
+        try:
+            self.body = self.read_body()
+            for route_method, pattern, handler in COMPILED_ROUTES:
+                match = pattern.match(url.path)
+                if match and route_method == method:
+                    result = handler(self.server.service, self, *(int(group) for group in match.groups()))
+                    self.send_json(200, result)
+                    return
+            raise ServiceError(404, "No route for {} {}".format(method, url.path))
+        except ServiceError as error:
+            self.send_json(error.status, {'error': str(error)})
+        except Exception as error:
+            self.send_json(500, {'error': "Internal error: {}".format(error)})
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ServiceError(400, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "Request body must be a JSON object")
+        return body
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ShopServer(HTTPServer):
+    # Serves each connection on a fixed-size thread pool
+    request_queue_size = 128
+    def __init__(self, address, platform, workers=SERVER_WORKERS):
+        HTTPServer.__init__(self, address, ShopRequestHandler)
+        self.service = ShopService(platform)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        self.pool.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the ecommerce platform as a JSON HTTP API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default=DATABASE_PATH, help="SQLite database (default: %(default)s)")
+    parser.add_argument('--log-dir', help="keep data in an operation log with snapshots in this directory instead of SQLite")
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS)
+    parser.add_argument('--shards', type=int, default=0, help="run product search in this many worker processes")
+    parser.add_argument('--instrument', action='store_true', help="time platform calls; report at GET /diagnostics")
+    args = parser.parse_args(argv)
+
+    storage = LogStorage(args.log_dir) if args.log_dir else SQLiteStorage(args.db)
+    platform = ShardedPlatform(storage, shards=args.shards) if args.shards else EcommercePlatform(storage)
+    if args.instrument:
+        Instrumentation().attach(platform)
+    server = ShopServer((args.host, args.port), platform, args.workers)
+    print("Serving on http://{}:{}".format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.shards:
+            platform.close()
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import multiprocessing
+import threading
+
+from GUI import EcommercePlatform, _page_end, _reads, _writes
+
+# Worker processes used by ShardedPlatform when no count is given
+DEFAULT_SHARDS = max(1, multiprocessing.cpu_count())
+
+# A cached earlier result up to this size is filtered locally instead of asking the shards
+SHARD_REFINE_LIMIT = 1000
+
+
+class ShardCatalog(EcommercePlatform):
+    # The platform in each worker process: the vendors and products of one shard,
+    # with the coordinator's ratings of those vendors so that the shard ranks by
+    # vendor score as the coordinator does
+    @_writes
+    def add_ratings(self, ratings):
+        for rating in ratings:
+            self.vendor_ratings.rating_added(rating)
+
+    @_reads
+    def vendor_product_ids(self, vendor_id, offset=0, limit=None, region=None):
+        if not self._vendor_in_region(vendor_id, region):
+            return []
+        products = self.products_by_vendor.get(vendor_id, [])
+        return [product['product_id'] for product in products[offset:_page_end(offset, limit)]]
+
+
+def _shard_main(conn):
+    # Runs in the worker process: a catalog-only platform answering calls from the pipe
+    platform = ShardCatalog(sample_data=False)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        method, args = message
+        try:
+            conn.send(('ok', getattr(platform, method)(*args)))
+        except Exception as error:
+            # The error itself, so the coordinator raises the same type; one that
+            # cannot be pickled is sent as text
+            try:
+                conn.send(('error', error))
+            except Exception:
+                conn.send(('error', RuntimeError("Shard error: {}: {}".format(type(error).__name__, error))))
+    conn.close()
+
+
+class Shard:
+    def __init__(self, context):
+        self.lock = threading.Lock()
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_shard_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def send(self, method, *args):
+        self.conn.send((method, args))
+
+    def reply(self):
+        # (status, result) of the last call sent; status is 'ok' or 'error'
+        return self.conn.recv()
+
+    def receive(self):
+        status, result = self.reply()
+        if status == 'error':
+            raise result
+        return result
+
+    def call(self, method, *args):
+        with self.lock:
+            self.send(method, *args)
+            return self.receive()
+
+    def stop(self):
+        with self.lock:
+            self.conn.send(None)
+            self.conn.close()
+        self.process.join()
+
+
+class ShardedPlatform(EcommercePlatform):
+    # EcommercePlatform whose catalog queries run in worker processes, each holding
+    # the search, filter and per-vendor indexes for the products of the vendors with
+    # vendor_id % shards == its number. Searches and filtered queries fan out to the
+    # shards, which filter, rank and count their own products; the coordinator merges
+    # their best ids and adds up their counts. Vendor listings go to the vendor's
+    # shard. The coordinator keeps only the product records themselves, with
+    # customers, orders and order items, so that carts read prices locally and
+    # checkout remains a single atomic transaction across vendors.
+    def __init__(self, storage=None, sample_data=True, shards=DEFAULT_SHARDS):
+        context = multiprocessing.get_context('spawn')
+        self.shards = [Shard(context) for _ in range(shards)]
+        EcommercePlatform.__init__(self, storage, sample_data)
+
+    def shard_for_vendor(self, vendor_id):
+        return self.shards[vendor_id % len(self.shards)]
+
+    def close(self):
+        for shard in self.shards:
+            shard.stop()
+
+    def _insert_vendor(self, vendor):
+        EcommercePlatform._insert_vendor(self, vendor)
+        self.shard_for_vendor(vendor['vendor_id']).call('bulk_add', 'vendors', [vendor.copy()])
+
+    def _index_products(self, products):
+        # The indexes live in the shards
+        batches = {}
+        for product in products:
+            batches.setdefault(self.shard_for_vendor(product['vendor_id']), []).append(product.copy())
+        self._fan_out([(shard, 'bulk_add', ('products', rows)) for shard, rows in batches.items()])
+
+    def _insert_rating(self, rating):
+        EcommercePlatform._insert_rating(self, rating)
+        self.shard_for_vendor(rating['vendor_id']).call('add_ratings', [rating.copy()])
+
+    @_reads
+    def list_vendor_products(self, vendor_id, offset=0, limit=None, region=None):
+        product_ids = self.shard_for_vendor(vendor_id).call('vendor_product_ids', vendor_id, offset, limit, region)
+        return [self.product_index[product_id] for product_id in product_ids]
+
+    def count_vendor_products(self, vendor_id, region=None):
+        return self.shard_for_vendor(vendor_id).call('count_vendor_products', vendor_id, region)
+
+    @_reads
+    def query_products(self, search_term='', min_price=None, max_price=None, vendor_ids=None,
+                       tags=None, regions=None, sort='relevance', limit=20, facets=True):
+        # Only the shards of the given vendors are asked; each returns its best
+        # `limit` ids in order, so the best overall are the head of their merge
+        key = self.facets.sort_key(tuple(search_term.lower().split()), sort)
+        if vendor_ids is None:
+            shards = self.shards
+        else:
+            vendor_ids = list(vendor_ids)
+            shards = {self.shard_for_vendor(vendor_id) for vendor_id in vendor_ids}
+        args = (search_term, min_price, max_price, vendor_ids, tags, regions, sort, limit, facets)
+        results = self._fan_out([(shard, 'query_products', args) for shard in shards])
+
+        counts = None
+        if facets:
+            counts = {'tag': {}, 'vendor': {}}
+            for result in results:
+                for facet, values in result['facets'].items():
+                    merged = counts[facet]
+                    for value, count in values.items():
+                        merged[value] = merged.get(value, 0) + count
+        return {
+            'total': sum(result['total'] for result in results),
+            'product_ids': list(itertools.islice(heapq.merge(*(result['product_ids'] for result in results), key=key), limit)),
+            'facets': counts
+        }
+
+    def _lookup_product_ids(self, terms, base=None):
+        if base is not None and len(base) <= SHARD_REFINE_LIMIT:
+            return [product_id for product_id in base if self._product_matches(self.product_index[product_id], terms)]
+        results = self._fan_out([(shard, 'search_product_ids', (" ".join(terms),)) for shard in self.shards])
+        return list(heapq.merge(*results))
+
+    def _fan_out(self, calls):
+        # Sends every call before waiting for any reply so the shards work in parallel.
+        # Locks are taken in shard order to avoid deadlocks between fanning-out threads.
+        # Every reply is read before an error is raised, so no pipe is left holding
+        # an answer the next call would read as its own.
+        calls = sorted(calls, key=lambda call: self.shards.index(call[0]))
+        for shard, method, args in calls:
+            shard.lock.acquire()
+        try:
+            for shard, method, args in calls:
+                shard.send(method, *args)
+            replies = [shard.reply() for shard, method, args in calls]
+        finally:
+            for shard, method, args in calls:
+                shard.lock.release()
+        for status, result in replies:
+            if status == 'error':
+                raise result
+        return [result for status, result in replies]
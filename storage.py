@@ -0,0 +1,178 @@
+import sqlite3
+import threading
+
+# Column order of every table, shared by both storage backends
+TABLES = {
+    'vendors': ('vendor_id', 'business_name', 'feedback_score', 'geographical_presence'),
+    'products': ('product_id', 'vendor_id', 'name', 'price', 'tag1', 'tag2', 'tag3'),
+    'customers': ('customer_id', 'name', 'contact_number', 'shipping_address'),
+    'orders': ('order_id', 'customer_id', 'order_date', 'status'),
+    'order_items': ('order_item_id', 'order_id', 'product_id', 'vendor_id', 'quantity', 'unit_price',
+                    'product_name', 'vendor_name'),
+    'ratings': ('rating_id', 'order_id', 'vendor_id', 'rating', 'rated_at'),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vendors (
+    vendor_id INTEGER PRIMARY KEY,
+    business_name TEXT NOT NULL,
+    feedback_score REAL NOT NULL DEFAULT 0.0,
+    geographical_presence TEXT
+);
+CREATE TABLE IF NOT EXISTS products (
+    product_id INTEGER PRIMARY KEY,
+    vendor_id INTEGER NOT NULL REFERENCES vendors(vendor_id),
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    tag1 TEXT,
+    tag2 TEXT,
+    tag3 TEXT
+);
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    contact_number TEXT,
+    shipping_address TEXT
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers(customer_id),
+    order_date REAL NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS order_items (
+    order_item_id INTEGER PRIMARY KEY,
+    order_id INTEGER NOT NULL REFERENCES orders(order_id),
+    product_id INTEGER NOT NULL REFERENCES products(product_id),
+    vendor_id INTEGER NOT NULL REFERENCES vendors(vendor_id),
+    quantity INTEGER NOT NULL,
+    unit_price REAL,
+    product_name TEXT,
+    vendor_name TEXT
+);
+CREATE TABLE IF NOT EXISTS ratings (
+    rating_id INTEGER PRIMARY KEY,
+    order_id INTEGER NOT NULL REFERENCES orders(order_id),
+    vendor_id INTEGER NOT NULL REFERENCES vendors(vendor_id),
+    rating INTEGER NOT NULL,
+    rated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_vendor ON products(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_vendor ON order_items(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_ratings_vendor ON ratings(vendor_id);
+"""
+
+
+class MemoryStorage:
+    # Keeps nothing; all state lives in the EcommercePlatform lists
+    def attach(self, platform):
+        pass
+
+    def load(self, table):
+        return iter(())
+
+    def is_empty(self):
+        return True
+
+    def insert(self, table, record):
+        pass
+
+    def insert_many(self, table, records):
+        pass
+
+    def update_order_status(self, order_id, status, item_prices=()):
+        pass
+
+    def delete_order_item(self, order_item_id):
+        pass
+
+    def update_item_quantities(self, quantities):
+        pass
+
+    def update_vendor_scores(self, scores):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.migrate()
+
+        # Statements are built once per table so sqlite3 can reuse them from its cache
+        self.insert_sql = {
+            table: "INSERT INTO {} ({}) VALUES ({})".format(table, ", ".join(columns), ", ".join("?" * len(columns)))
+            for table, columns in TABLES.items()
+        }
+        self.select_sql = {
+            table: "SELECT {} FROM {} ORDER BY {}".format(", ".join(columns), table, columns[0])
+            for table, columns in TABLES.items()
+        }
+
+    def migrate(self):
+        # Databases created before order items kept their price, product name and
+        # vendor name; the platform fills in the names of old items when loading
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(order_items)")]
+        for column, column_type in (('unit_price', 'REAL'), ('product_name', 'TEXT'), ('vendor_name', 'TEXT')):
+            if column not in columns:
+                with self.conn:
+                    self.conn.execute("ALTER TABLE order_items ADD COLUMN {} {}".format(column, column_type))
+
+    def attach(self, platform):
+        pass
+
+    def load(self, table):
+        columns = TABLES[table]
+        with self.lock:
+            rows = self.conn.execute(self.select_sql[table]).fetchall()
+        for row in rows:
+            yield dict(zip(columns, row))
+
+    def is_empty(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM vendors LIMIT 1").fetchone() is None
+
+    def insert(self, table, record):
+        row = tuple(record[column] for column in TABLES[table])
+        with self.lock, self.conn:
+            self.conn.execute(self.insert_sql[table], row)
+
+    def insert_many(self, table, records):
+        columns = TABLES[table]
+        with self.lock, self.conn:
+            self.conn.executemany(self.insert_sql[table], (tuple(r[c] for c in columns) for r in records))
+
+    def update_order_status(self, order_id, status, item_prices=()):
+        # item_prices: (unit_price, order_item_id) pairs saved in the same transaction
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE orders SET status = ? WHERE order_id = ?", (status, order_id))
+            self.conn.executemany("UPDATE order_items SET unit_price = ? WHERE order_item_id = ?", item_prices)
+
+    def delete_order_item(self, order_item_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM order_items WHERE order_item_id = ?", (order_item_id,))
+
+    def update_item_quantities(self, quantities):
+        # quantities: (quantity, order_item_id) pairs
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE order_items SET quantity = ? WHERE order_item_id = ?", quantities)
+
+    def update_vendor_scores(self, scores):
+        # scores: (feedback_score, vendor_id) pairs
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE vendors SET feedback_score = ? WHERE vendor_id = ?", scores)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()